@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        '''Connect the blog's signal handlers, and check the cache is shared.'''
+        from . import signals  # noqa: F401
+        from cs412.checks import check_shared_cache
+        checks.register(check_shared_cache, checks.Tags.caches, deploy=True)
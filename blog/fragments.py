@@ -0,0 +1,26 @@
+## blog/fragments.py
+# Cached template fragments of blog/article.html: the article body and its comment list.
+# Both are cached per article with {% cache %} and deleted by blog/signals.py as soon
+# as the Article or one of its Comments is written.
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+#how long (seconds) a fragment may be served before it is re-rendered anyway
+FRAGMENT_CACHE_TIMEOUT = 3600
+
+#fragment names used in blog/article.html
+ARTICLE_BODY = 'article_body'
+ARTICLE_COMMENTS = 'article_comments'
+
+def invalidate_article_body(article_pk):
+    '''Drop the cached body of the article with this pk.'''
+    cache.delete(make_template_fragment_key(ARTICLE_BODY, [article_pk]))
+
+def invalidate_article_comments(article_pk):
+    '''Drop the cached comment list of the article with this pk.'''
+    cache.delete(make_template_fragment_key(ARTICLE_COMMENTS, [article_pk]))
+
+def article_fragments_cached(article_pk):
+    '''Return True if both fragments of the article with this pk are in the cache.'''
+    keys = [make_template_fragment_key(name, [article_pk]) for name in (ARTICLE_BODY, ARTICLE_COMMENTS)]
+    return len(cache.get_many(keys)) == len(keys)
@@ -0,0 +1,58 @@
+## blog/management/commands/bench_random_article.py
+# Benchmark picking a random Article: the old random.choice(Article.objects.all())
+# against Article.get_random(), at several table sizes.
+# The articles it creates are rolled back at the end.
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Article, invalidate_article_pks
+
+class Rollback(Exception):
+    '''Raised to roll back the benchmark data.'''
+
+def old_random_article():
+    '''The original RandomArticleView.get_object.'''
+    return random.choice(Article.objects.all())
+
+class Command(BaseCommand):
+    '''Time both random-article strategies and print the median per call.'''
+    help = 'Benchmark random Article selection against the original implementation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='Numbers of articles to benchmark with.')
+        parser.add_argument('--repeat', type=int, default=50, help='Calls timed per strategy and size.')
+
+    def time_calls(self, function, repeat):
+        '''Return the median time of one call of function, in milliseconds.'''
+        times = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            function()
+            times.append((time.perf_counter() - start) * 1000)
+        return statistics.median(times)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"articles":>10} {"old (ms)":>10} {"new (ms)":>10}')
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='bench_random_article')
+                count = Article.objects.count()
+                for size in sorted(options['sizes']):
+                    Article.objects.bulk_create(
+                        [Article(title=f'Article {i}', author='bench', text='lorem ipsum ' * 200, user=user)
+                         for i in range(count, size)], batch_size=500)
+                    count = max(count, size)
+                    invalidate_article_pks()
+                    old = self.time_calls(old_random_article, options['repeat'])
+                    new = self.time_calls(Article.get_random, options['repeat'])
+                    self.stdout.write(f'{count:>10} {old:>10.3f} {new:>10.3f}')
+                raise Rollback
+        except Rollback:
+            pass
+        invalidate_article_pks()
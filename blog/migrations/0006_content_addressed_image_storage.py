@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:29
+
+import cs412.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_article_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='article',
+            name='image_file',
+            field=models.ImageField(blank=True, storage=cs412.storage.ContentAddressedStorage(), upload_to=''),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_content_addressed_image_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-published', '-id'], name='article_published_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_article_published_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'published'], name='comment_article_published_idx'),
+        ),
+    ]
@@ -6,6 +6,41 @@
 from django.db import models
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from cs412.storage import content_storage
+import random
+import time
+import uuid
+
+#the list of Article pks used by Article.get_random is kept in each process;
+#a version number in the cache tells every process when to reload it. That only reaches the
+#other processes if CACHES is shared between them (CACHE_BACKEND=redis or file): with the
+#default per-process locmem cache a new Article can be missing from another process's list
+#for up to ARTICLE_PKS_TIMEOUT (a deleted one is never returned, see get_random)
+ARTICLE_PKS_VERSION_KEY = 'blog:article_pks_version'
+#reload the list at least this often (seconds) anyway
+ARTICLE_PKS_TIMEOUT = 300
+_article_pks = {'version': None, 'loaded': 0.0, 'pks': []}
+
+def get_article_pks():
+    '''Return the list of every Article pk; reloaded only when Articles were added/deleted.'''
+    version = cache.get(ARTICLE_PKS_VERSION_KEY)
+    if version is None:
+        cache.add(ARTICLE_PKS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(ARTICLE_PKS_VERSION_KEY)
+    now = time.monotonic()
+    if _article_pks['version'] != version or now - _article_pks['loaded'] > ARTICLE_PKS_TIMEOUT:
+        _article_pks['pks'] = list(Article.objects.values_list('pk', flat=True))
+        _article_pks['version'] = version
+        _article_pks['loaded'] = now
+    return _article_pks['pks']
+
+def invalidate_article_pks():
+    '''Make every process reload its list of Article pks (called when Articles are created or deleted),
+    now and again when the current transaction commits (a process may reload before that).'''
+    cache.set(ARTICLE_PKS_VERSION_KEY, uuid.uuid4().hex, None)
+    transaction.on_commit(lambda: cache.set(ARTICLE_PKS_VERSION_KEY, uuid.uuid4().hex, None))
 
 #Each model is a class
 class Article(models.Model): #class MUST inheirit 
@@ -16,9 +51,15 @@ class Article(models.Model): #class MUST inheirit
     text = models.TextField(blank=False)
     published = models.DateTimeField(auto_now=True) #auto_now=True sets the time to now upon Model instantiation
     #image_url = models.URLField(blank=True) ## new
-    image_file = models.ImageField(blank=True) # an actual image
+    image_file = models.ImageField(blank=True, storage=content_storage) # an actual image, stored by content hash (cs412/storage.py)
     # data attributes of a Article:
     user = models.ForeignKey(User, on_delete=models.CASCADE) ## NEW
+
+    class Meta:
+        indexes = [
+            #the article list is shown newest first, paginated on (published, id)
+            models.Index(fields=['-published', '-id'], name='article_published_idx'),
+        ]
     
     #Default method so name MUST match (Admin can display this rather than the unique ID)
     def __str__(self):
@@ -27,13 +68,28 @@ class Article(models.Model): #class MUST inheirit
 
     def get_comments(self):
         '''Return all of the comments about this article.'''
-        comments = Comment.objects.filter(article=self)
+        comments = Comment.objects.filter(article=self).order_by('published', 'id')
         return comments
     
     def get_absolute_url(self):
         '''Return the URL to display this Article.'''
         return reverse('article', kwargs={'pk':self.pk})
 
+    @staticmethod
+    def get_random():
+        '''Return one Article chosen uniformly at random (None if there are none).
+        Picks a pk from the cached pk index and fetches just that row.'''
+        for attempt in range(3):
+            pks = get_article_pks()
+            if not pks:
+                return None
+            article = Article.objects.filter(pk=random.choice(pks)).first()
+            if article is not None:
+                return article
+            # the index was stale (article deleted elsewhere): rebuild it and try again
+            invalidate_article_pks()
+        return Article.objects.order_by('?').first()
+
 class Comment(models.Model):
     '''Encapsulate the idea of a Comment on an Article.'''
     
@@ -44,6 +100,12 @@ class Comment(models.Model):
     author = models.TextField(blank=False)
     text = models.TextField(blank=False)
     published = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            #an article's comments are shown oldest first (Article.get_comments)
+            models.Index(fields=['article', 'published'], name='comment_article_published_idx'),
+        ]
     
     def __str__(self):
         '''Return a string representation of this Comment object.'''
@@ -0,0 +1,35 @@
+## blog/signals.py
+# Signal handlers for the blog app.
+# Connected in BlogConfig.ready() (blog/apps.py).
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from cs412.storage import release_files
+from .models import Article, Comment, invalidate_article_pks
+from .fragments import invalidate_article_body, invalidate_article_comments
+
+# delete an Article's image once no other row shares it
+post_delete.connect(release_files, sender=Article, dispatch_uid='blog_article_release_files')
+
+@receiver(post_save, sender=Article)
+def article_saved(sender, instance, created, **kwargs):
+    '''A new Article must be added to the pk index used by Article.get_random;
+    an edited one must be re-rendered.'''
+    if created:
+        invalidate_article_pks()
+    else:
+        invalidate_article_body(instance.pk)
+
+@receiver(post_delete, sender=Article)
+def article_deleted(sender, instance, **kwargs):
+    '''A deleted Article must be removed from the pk index used by Article.get_random
+    and from the fragment cache.'''
+    invalidate_article_pks()
+    invalidate_article_body(instance.pk)
+    invalidate_article_comments(instance.pk)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    '''Re-render an article's comment list after one of its comments is created, edited or deleted.'''
+    invalidate_article_comments(instance.article_id)
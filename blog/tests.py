@@ -1,3 +1,121 @@
+## blog/tests.py
+# Tests for the blog app
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from cs412.testing import QueryPlanTestMixin
+from . import models
+from .fragments import article_fragments_cached
+from .models import Article, Comment, get_article_pks
+
+class QueryPlanTest(QueryPlanTestMixin, TestCase):
+    '''The blog pages must be answered from indexes, without reading whole tables.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='writer')
+        for i in range(5):
+            article = Article.objects.create(title=f'Article {i}', author='writer', text='lorem ipsum', user=user)
+            for j in range(3):
+                Comment.objects.create(article=article, author='reader', text=f'comment {j}')
+        cls.article = article
+
+    def test_show_all(self):
+        self.assertNoFullScans(reverse('show_all_articles'))
+
+    def test_article(self):
+        self.assertNoFullScans(reverse('article', kwargs={'pk': self.article.pk}))
+
+
+class ArticlePksTest(TestCase):
+    '''The per-process list of Article pks behind Article.get_random follows creates and deletes.'''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+
+    def article(self, title):
+        return Article.objects.create(title=title, author='writer', text='lorem ipsum', user=self.user)
+
+    def test_create_and_delete_invalidate(self):
+        first = self.article('first')
+        self.assertEqual(get_article_pks(), [first.pk])
+        second = self.article('second')
+        self.assertCountEqual(get_article_pks(), [first.pk, second.pk])
+        first.delete()
+        self.assertEqual(get_article_pks(), [second.pk])
+
+    def test_version_bump_reaches_other_processes(self):
+        article = self.article('first')
+        self.assertEqual(get_article_pks(), [article.pk])
+        # bulk_create sends no signals: this process does not know about the new row yet
+        added, = Article.objects.bulk_create([Article(title='second', author='writer', text='x', user=self.user)])
+        self.assertEqual(get_article_pks(), [article.pk])
+        # another process (sharing the cache) bumps the version
+        models.invalidate_article_pks()
+        self.assertCountEqual(get_article_pks(), [article.pk, added.pk])
+
+    def test_get_random_skips_stale_pks(self):
+        article = self.article('kept')
+        get_article_pks()
+        # a list loaded before another process deleted an article
+        models._article_pks['pks'] = [article.pk, article.pk + 1000]
+        for i in range(10):
+            self.assertEqual(Article.get_random(), article)
+
+
+class ArticleFragmentsTest(TestCase):
+    '''The article page serves its body and comment list from the fragment cache until
+    the article or one of its comments is written.'''
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username='writer')
+        self.article = Article.objects.create(title='Travels', author='writer', text='there and back', user=user)
+        self.comment = Comment.objects.create(article=self.article, author='reader', text='first comment')
+        self.url = reverse('article', kwargs={'pk': self.article.pk})
+
+    def get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_fragments_are_served_from_cache(self):
+        self.assertFalse(article_fragments_cached(self.article.pk))
+        self.assertContains(self.get(), 'there and back')
+        self.assertTrue(article_fragments_cached(self.article.pk))
+        # update() sends no signals, so the cached fragments are still served
+        Article.objects.filter(pk=self.article.pk).update(text='changed behind the cache')
+        Comment.objects.filter(pk=self.comment.pk).update(text='changed comment')
+        response = self.get()
+        self.assertContains(response, 'there and back')
+        self.assertContains(response, 'first comment')
+        # with both fragments cached only the pk is loaded
+        self.assertEqual(response.context['article'].get_deferred_fields() & {'text', 'title'}, {'text', 'title'})
+
+    def test_editing_the_article_invalidates_the_body(self):
+        self.get()
+        self.article.text = 'a long expected party'
+        self.article.save()
+        self.assertFalse(article_fragments_cached(self.article.pk))
+        self.assertContains(self.get(), 'a long expected party')
+
+    def test_comments_invalidate_the_comment_list(self):
+        self.get()
+        added = Comment.objects.create(article=self.article, author='reader', text='second comment')
+        self.assertFalse(article_fragments_cached(self.article.pk))
+        response = self.get()
+        self.assertContains(response, 'first comment')
+        self.assertContains(response, 'second comment')
+        added.delete()
+        self.assertFalse(article_fragments_cached(self.article.pk))
+        self.assertNotContains(self.get(), 'second comment')
+
+    def test_other_articles_keep_their_fragments(self):
+        other = Article.objects.create(title='Other', author='writer', text='x', user=self.article.user)
+        self.get()
+        self.client.get(reverse('article', kwargs={'pk': other.pk}))
+        Comment.objects.create(article=self.article, author='reader', text='second comment')
+        self.assertTrue(article_fragments_cached(other.pk))
@@ -2,20 +2,39 @@
 # blog/views.py
 # Define the views for the blog app:
 #from django.shortcuts import render
-import random
 
-from django.http import HttpRequest
+from django.http import HttpRequest, Http404
 from django.http.response import HttpResponse as HttpResponse
 from .models import *
+from .fragments import FRAGMENT_CACHE_TIMEOUT, article_fragments_cached
+from django.db.models.functions import Substr
+from cs412.pagination import keyset_page
 from django.views.generic import ListView, DetailView #ListView is a custom component which displays a list of the model
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 #class-based view
 class ShowAllView(ListView):
-    '''Create a subclass of ListView to display all blog articles.'''
+    '''Create a subclass of ListView to display one page of blog articles, newest first.'''
     model = Article # retrieve objects of type Article from the database
     template_name = 'blog/show_all.html'
     context_object_name = 'articles' # how to find the data in the template file (context variable)
+    #articles per page, and how many characters of each article's text are shown
+    page_size = 10
+    excerpt_length = 300
+
+    def get_queryset(self):
+        '''Return one page of articles starting after the ?before= cursor, without loading their full text.'''
+        articles = (Article.objects.only('id', 'title', 'author', 'published', 'image_file')
+                                   .annotate(excerpt=Substr('text', 1, self.excerpt_length)))
+        page, self.next_cursor = keyset_page(articles, self.request.GET.get('before'),
+                                             timestamp_field='published', page_size=self.page_size)
+        return page
+
+    def get_context_data(self, **kwargs):
+        '''Add the cursor of the next page.'''
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        return context
 
     def dispatch(self, *args, **kwargs):
         print(f"ShowAllView.dispatch; self.request.user={self.request.user}")
@@ -24,7 +43,15 @@ class ShowAllView(ListView):
 # The difference between a ListView and a DetailView:
 #   ListView shows all objects
 #   DetailView shows one object
-class RandomArticleView(DetailView):
+class ArticleFragmentCacheMixin:
+    '''Pass the fragment cache timeout used by blog/article.html (see blog/fragments.py).'''
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['fragment_cache_timeout'] = FRAGMENT_CACHE_TIMEOUT
+        return context
+
+class RandomArticleView(ArticleFragmentCacheMixin, DetailView):
     '''Show the details for one article.'''
     model = Article
     template_name = 'blog/article.html'
@@ -34,15 +61,25 @@ class RandomArticleView(DetailView):
     def get_object(self):
         '''Return one Article object chosen at random.'''
         #get_object is a default method for DetailView so we override it to get a random article
-        all_articles = Article.objects.all()
-        return random.choice(all_articles)
+        #(one row fetched by a pk sampled from a cached index, rather than loading every Article)
+        article = Article.get_random()
+        if article is None:
+            raise Http404('There are no articles yet.')
+        return article
     
-class ArticleView(DetailView):
+class ArticleView(ArticleFragmentCacheMixin, DetailView):
     '''Show the details for one article by Primary Key (PK).'''
     model = Article
     template_name = 'blog/article.html'
     context_object_name = 'article'
 
+    def get_queryset(self):
+        '''When the article's fragments are already cached the page only needs its pk,
+        so skip loading the (possibly large) text.'''
+        if article_fragments_cached(self.kwargs['pk']):
+            return Article.objects.only('pk')
+        return Article.objects.all()
+
 
 ## write the CreateCommentView
 # comments/views.py
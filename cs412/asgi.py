@@ -3,6 +3,13 @@ ASGI config for cs412 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server, for example:
+
+    uvicorn cs412.asgi:application --workers 4
+
+Under ASGI the mini_fb profile page and news feed use their async views, which run
+their independent queries concurrently (set MINI_FB_ASYNC_VIEWS=0 to turn them off).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -12,5 +19,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cs412.settings')
+os.environ.setdefault('MINI_FB_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
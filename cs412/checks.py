@@ -0,0 +1,16 @@
+## cs412/checks.py
+# System checks shared by the apps (registered in their AppConfig.ready()).
+from django.conf import settings
+from django.core import checks
+
+def check_shared_cache(app_configs, **kwargs):
+    '''Warn when the default cache is per-process: the caches that are invalidated through
+    it (mini_fb/caching.py, the blog's Article pk list) then serve stale data in the other workers.'''
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.endswith('.LocMemCache') or backend.endswith('.DummyCache'):
+        return [checks.Warning(
+            'The default cache is not shared between processes.',
+            hint='With more than one worker process, set CACHE_BACKEND to redis or file, '
+                 'so that cache invalidations reach every worker.',
+            id='cs412.W001')]
+    return []
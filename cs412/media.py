@@ -0,0 +1,143 @@
+## cs412/media.py
+# Serving user uploads (MEDIA_ROOT) for cs412/urls.py.
+#
+# Unlike django.views.static.serve this answers conditional requests
+# (If-None-Match / If-Modified-Since -> 304) and single byte-range requests (206),
+# and with settings.MEDIA_SENDFILE it only checks the request and hands the file to
+# the front proxy (nginx X-Accel-Redirect, Apache/lighttpd X-Sendfile), so no Python
+# worker is tied up streaming the bytes.
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import CONTENT_DIR, TMP_DIR
+
+#files whose name is derived from their content never change, so they can be cached forever
+IMMUTABLE_PREFIXES = (f'{CONTENT_DIR}/', f'renditions/{CONTENT_DIR}/')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+#uploads still being written (cs412/storage.py) are never served
+PRIVATE_PREFIXES = (f'{TMP_DIR}/',)
+#bytes read per chunk when streaming a range
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def parse_range(header, size):
+    '''Return the (start, end) byte offsets (inclusive) asked for by a Range header, None if
+    the whole file should be sent (no header, multiple ranges or a malformed header), or
+    False if the range cannot be satisfied.'''
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        #suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+def range_matches(request, etag, last_modified):
+    '''Return whether an If-Range header (if any) still describes the file, so a partial response may be sent.'''
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+def iter_range(path, start, length):
+    '''Yield length bytes of the file at path starting at offset start.'''
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def cache_control(name):
+    '''Return the Cache-Control header value for the media file called name.'''
+    if name.startswith(IMMUTABLE_PREFIXES):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+def sendfile_response(name, fullpath):
+    '''Return an empty response telling the front proxy to send the file itself.'''
+    response = HttpResponse()
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        #nginx decodes the URI, so names with spaces or non-ASCII characters must be quoted
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+    else:
+        response['X-Sendfile'] = fullpath
+    #let the proxy pick the content type from the file
+    del response['Content-Type']
+    return response
+
+@require_safe
+def serve_media(request, path):
+    '''Serve the file at path inside MEDIA_ROOT.'''
+    name = os.path.normpath(path).replace('\\', '/').lstrip('/')
+    if f'{name}/'.startswith(PRIVATE_PREFIXES):
+        raise Http404('Media file not found')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(fullpath)
+    except (OSError, ValueError):
+        raise Http404('Media file not found')
+    if not os.path.isfile(fullpath):
+        raise Http404('Media file not found')
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    headers = {'ETag': etag,
+               'Last-Modified': http_date(last_modified),
+               'Cache-Control': cache_control(name),
+               'Accept-Ranges': 'bytes'}
+
+    #304 Not Modified / 412 Precondition Failed
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for header, value in headers.items():
+            response.headers.setdefault(header, value)
+        return response
+
+    if settings.MEDIA_SENDFILE:
+        #the proxy handles Range itself
+        response = sendfile_response(name, fullpath)
+    else:
+        byte_range = None
+        if range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get('Range'), size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range is None:
+            response = FileResponse(open(fullpath, 'rb'))
+        else:
+            start, end = byte_range
+            content_type, encoding = mimetypes.guess_type(fullpath)
+            response = StreamingHttpResponse(iter_range(fullpath, start, end - start + 1), status=206,
+                                             content_type=content_type or 'application/octet-stream')
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+    for header, value in headers.items():
+        response[header] = value
+    return response
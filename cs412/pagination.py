@@ -0,0 +1,81 @@
+## cs412/pagination.py
+# Keyset (cursor) pagination shared by the apps: on (timestamp, id) for the mini_fb status
+# message lists and news feed and the blog index, and on (sort key, id) for the mini_fb
+# profile directory.
+# A page is fetched with "WHERE (timestamp, id) < cursor ORDER BY timestamp DESC, id DESC LIMIT n",
+# so its cost does not depend on how many older rows there are (unlike OFFSET).
+import datetime
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+#number of rows shown per page
+PAGE_SIZE = 20
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+def encode_cursor(timestamp, pk):
+    '''Return the cursor string for the row with this timestamp and pk.'''
+    micros = (timestamp - EPOCH) // datetime.timedelta(microseconds=1)
+    return f'{micros}-{pk}'
+
+def decode_cursor(cursor):
+    '''Return the (timestamp, pk) tuple stored in a cursor string.'''
+    try:
+        micros, pk = cursor.rsplit('-', 1)
+        return EPOCH + datetime.timedelta(microseconds=int(micros)), int(pk)
+    except (ValueError, OverflowError):
+        raise BadRequest(f'Invalid cursor: {cursor}')
+
+def keyset_filter(queryset, cursor=None, timestamp_field='timestamp', id_field='id'):
+    '''Return queryset ordered by (timestamp_field, id_field) descending and limited to the
+    rows that come after cursor (not yet sliced to a page).'''
+    queryset = queryset.order_by(f'-{timestamp_field}', f'-{id_field}')
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{timestamp_field}__lt': timestamp}) |
+                                   Q(**{timestamp_field: timestamp, f'{id_field}__lt': pk}))
+    return queryset
+
+def split_page(rows, timestamp_field='timestamp', id_field='id', page_size=PAGE_SIZE):
+    '''Return (rows, next_cursor) from the first page_size + 1 rows of a keyset_filter() queryset.'''
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_field), getattr(last, id_field))
+    return rows, next_cursor
+
+def keyset_page(queryset, cursor=None, timestamp_field='timestamp', id_field='id', page_size=PAGE_SIZE):
+    '''Return (rows, next_cursor) for the page of queryset that comes after cursor.
+    queryset is ordered here by (timestamp_field, id_field) descending; next_cursor is
+    None on the last page.'''
+    queryset = keyset_filter(queryset, cursor, timestamp_field, id_field)
+    # fetch one extra row to find out whether there is another page
+    rows = list(queryset[:page_size + 1])
+    return split_page(rows, timestamp_field, id_field, page_size)
+
+def sorted_page(queryset, key, after=None, page_size=PAGE_SIZE):
+    '''Return (rows, next_after) for the page of queryset ordered ascending by the
+    expression key (then id) that starts after the row whose pk is after.
+    next_after is the pk to pass for the following page, or None on the last page.'''
+    queryset = queryset.annotate(sort_key=key).order_by('sort_key', 'id')
+    if after:
+        try:
+            after = int(after)
+        except ValueError:
+            raise BadRequest(f'Invalid cursor: {after}')
+        # the cursor is just a pk; its sort key is one primary key lookup away
+        last_key = (queryset.model._default_manager.filter(pk=after)
+                                                   .annotate(sort_key=key)
+                                                   .values_list('sort_key', flat=True)
+                                                   .first())
+        if last_key is None:
+            raise BadRequest(f'Invalid cursor: {after}')
+        queryset = queryset.filter(Q(sort_key__gt=last_key) | Q(sort_key=last_key, id__gt=after))
+    rows = list(queryset[:page_size + 1])
+    next_after = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_after = rows[-1].pk
+    return rows, next_after
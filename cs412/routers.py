@@ -0,0 +1,112 @@
+## cs412/routers.py
+# Primary/replica database routing (settings.DATABASE_ROUTERS), used when a 'replica'
+# database is configured (see DB_REPLICA_NAME in settings.py).
+#
+# Writes always go to the primary ('default'); reads go to the replica unless the current
+# request or thread is pinned to the primary. A request is pinned when it is not a safe
+# method (POST etc., so form views read what they are about to change), and for
+# REPLICA_STICKY_SECONDS after it the client gets a cookie that keeps pinning its requests,
+# so users see their own writes even if the replica lags behind.
+import contextvars
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+#cookie holding the time (epoch seconds) until which this client reads from the primary
+STICKY_COOKIE = 'db_primary_until'
+
+_pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+#set by the router when the current request writes
+_wrote = contextvars.ContextVar('wrote_to_primary', default=None)
+
+@contextmanager
+def use_primary():
+    '''Send every read in this block (in this thread or task) to the primary.'''
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+class PrimaryReplicaRouter:
+    '''Route reads to the replica and writes to the primary.'''
+
+    def db_for_read(self, model, **hints):
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        # follow relations of an object on the database it was loaded from
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote[0] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica gets its schema from the primary
+        return db == DEFAULT_DB_ALIAS
+
+class ReplicaStickinessMiddleware:
+    '''Pin writing requests, and the client's requests for a short time after a write, to the primary.
+    Must come before any middleware that reads from the database (sessions, auth).'''
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens, wrote = self.pin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.unpin(tokens)
+        return self.stick(response, wrote)
+
+    async def __acall__(self, request):
+        tokens, wrote = self.pin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.unpin(tokens)
+        return self.stick(response, wrote)
+
+    def pin(self, request):
+        '''Pin this request to the primary if it writes or the client wrote recently.'''
+        try:
+            sticky = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        wrote = [False]
+        tokens = (_pinned.set(sticky or request.method not in ('GET', 'HEAD', 'OPTIONS')), _wrote.set(wrote))
+        return tokens, wrote
+
+    def unpin(self, tokens):
+        '''Undo pin().'''
+        _pinned.reset(tokens[0])
+        _wrote.reset(tokens[1])
+
+    def stick(self, response, wrote):
+        '''Keep the client on the primary for a while if this request wrote.'''
+        if wrote[0]:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(STICKY_COOKIE, str(time.time() + seconds), max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
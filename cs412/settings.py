@@ -24,7 +24,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-3qis@c!&zf(l!ot**2_v@zzg+-8v9g1*o2^n6r6xmbob82cpe6'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ['*', '.vercel.app']
 
@@ -45,18 +45,21 @@ INSTALLED_APPS = [
     'formdata', #Example formdata app
     'blog', #Example blog app
     'mini_fb', #Assignment 5 app
+    'search', #Full-text search over mini_fb and blog
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    #serve static files before sessions/auth/csrf run (https://whitenoise.readthedocs.io/en/stable/django.html);
+    #cs412/staticfiles.py lets it run in an async (ASGI) middleware stack too
+    'cs412.staticfiles.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'mini_fb.middleware.CurrentProfileMiddleware', #sets request.profile (mini_fb)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
 ]
 
 ROOT_URLCONF = 'cs412.urls'
@@ -84,20 +87,114 @@ WSGI_APPLICATION = 'cs412.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_PROFILE picks the database setup:
+#   dev      - SQLite with Django's defaults (a new connection per request)
+#   sqlite   - SQLite tuned for serving: persistent connections, WAL journaling,
+#              synchronous=NORMAL, a busy timeout and memory-mapped I/O
+#   postgres - PostgreSQL (DB_NAME, DB_USER, ...) through a psycopg3 connection pool
+#              whose connections are health-checked before they are handed out
+# mini_fb/management/commands/bench_db_profiles.py compares them.
+DB_PROFILE = os.environ.get('DB_PROFILE', 'dev')
+
+if DB_PROFILE == 'postgres':
+    from psycopg_pool import ConnectionPool
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            "NAME": os.environ.get('DB_NAME'),
+            "USER": os.environ.get('DB_USER'),
+            "PASSWORD": os.environ.get('DB_PASSWORD'),
+            "HOST": os.environ.get('DB_HOST'),
+            "PORT": os.environ.get('DB_PORT'),
+            # the pool keeps the connections open, so Django must not (CONN_MAX_AGE must be 0)
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                    "max_size": int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                    "timeout": 10,
+                    "check": ConnectionPool.check_connection,
+                },
+            },
+        }
     }
-    # 'default': {
-    #     'ENGINE': 'django.db.backends.postgresql',
-    #     "NAME": os.environ.get('DB_NAME'),
-    #     "USER": os.environ.get('DB_USER'),
-    #     "PASSWORD": os.environ.get('DB_PASSWORD'),
-    #     "HOST": os.environ.get('DB_HOST'),
-    #     "PORT": os.environ.get('DB_PORT'),
-    # }
-}
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # seconds to wait for a lock (busy timeout) instead of failing with "database is locked"
+                'timeout': 20,
+                # take the write lock when a transaction starts, so concurrent writers wait for it
+                # instead of failing when they try to upgrade a read lock
+                'transaction_mode': 'IMMEDIATE',
+                # run on every new connection
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+# Optional read replica (cs412/routers.py): reads go to it, writes to 'default', and a client
+# reads from 'default' for REPLICA_STICKY_SECONDS after writing so it sees its own changes.
+# DB_REPLICA_NAME is an SQLite file (for local testing, a copy of db.sqlite3);
+# with DB_PROFILE=postgres, DB_REPLICA_HOST is a hot standby of DB_HOST.
+REPLICA_STICKY_SECONDS = 10
+if os.environ.get('DB_REPLICA_HOST') and DB_PROFILE == 'postgres':
+    DATABASES['replica'] = {**DATABASES['default'], 'HOST': os.environ['DB_REPLICA_HOST']}
+elif os.environ.get('DB_REPLICA_NAME') and DB_PROFILE != 'postgres':
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': os.environ['DB_REPLICA_NAME']}
+if 'replica' in DATABASES:
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['cs412.routers.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(MIDDLEWARE.index('cs412.staticfiles.AsyncWhiteNoiseMiddleware') + 1,
+                      'cs412.routers.ReplicaStickinessMiddleware')
+
+
+# CACHE_BACKEND picks the cache used for page fragments, quotes and the mini_fb profile cache:
+#   locmem - per-process memory (default); only for a single process, since deleting an
+#            entry does not reach other processes (see cs412/checks.py)
+#   file   - files in CACHE_LOCATION, shared by the processes on one machine
+#   redis  - a Redis (or Redis-compatible) server at CACHE_LOCATION, shared by every machine
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', '/var/tmp/cs412_cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'cs412',
+        }
+    }
+# seconds a cached Profile, friend-id set or status message page (mini_fb/caching.py) is kept
+MINI_FB_CACHE_TIMEOUT = 10 * 60
 
 
 # Password validation
@@ -119,6 +216,15 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Load the logged-in user and their mini_fb Profile in one query (see mini_fb/backends.py).
+# ModelBackend stays listed so sessions logged in before ProfileBackend (which store its path) stay valid;
+# ProfileBackend comes first, so every new login uses it.
+AUTHENTICATION_BACKENDS = [
+    'mini_fb.backends.ProfileBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -141,8 +247,53 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Production static files: set DJANGO_STATIC_MANIFEST=1 (with DJANGO_DEBUG=0) and run collectstatic. Files are then
+# served by WhiteNoise under hashed names with gzip and Brotli variants built at collectstatic time
+# and immutable far-future cache headers, and the Django static route in cs412/urls.py is dropped.
+STATIC_MANIFEST = os.environ.get('DJANGO_STATIC_MANIFEST', '') == '1'
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": ("whitenoise.storage.CompressedManifestStaticFilesStorage" if STATIC_MANIFEST
+                    else "django.contrib.staticfiles.storage.StaticFilesStorage"),
+    },
+}
+if STATIC_MANIFEST:
+    # serve only what collectstatic built, and don't rescan the files on every request
+    WHITENOISE_AUTOREFRESH = False
+    WHITENOISE_USE_FINDERS = False
+    # unhashed names (e.g. hard-coded /static/... links) may change, so they get a short lifetime
+    WHITENOISE_MAX_AGE = 60
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 MEDIA_URL = "/media/"
+# Media files are served by cs412/media.py (conditional GET, byte ranges). Behind a front proxy set
+# DJANGO_MEDIA_SENDFILE to 'x-accel-redirect' (nginx, with an internal location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd) so the proxy streams the file instead.
+MEDIA_SENDFILE = os.environ.get('DJANGO_MEDIA_SENDFILE', '') or None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# browser cache lifetime (seconds) of media files that are not content-addressed
+MEDIA_MAX_AGE = 60 * 60
+# an uploaded file that an identical upload reused this recently is not deleted when a row
+# releases it (cs412/storage.py); must be longer than any transaction that saves an upload
+MEDIA_RELEASE_GRACE_SECONDS = 15 * 60
+
+# mini_fb image renditions (mini_fb/thumbnails.py): size of the background thread pool,
+# and whether to generate them inline instead (useful for tests and management scripts)
+MINI_FB_THUMBNAIL_WORKERS = 2
+MINI_FB_THUMBNAILS_SYNC = False
+
+# serve the mini_fb profile page and news feed with their async views (set by cs412/asgi.py)
+MINI_FB_ASYNC_VIEWS = os.environ.get('MINI_FB_ASYNC_VIEWS', '') == '1'
+
+# quotes app: show the same quote/image to everybody for this many seconds, so the pages
+# can be cached (0 picks a new random quote on every request)
+QUOTES_ROTATION_SECONDS = 24 * 60 * 60
+
+# shared secret for the batched order endpoint (restaurant/orders/batch/); the endpoint is disabled when empty
+RESTAURANT_ORDER_TOKEN = os.environ.get('RESTAURANT_ORDER_TOKEN', '')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -0,0 +1,34 @@
+## cs412/staticfiles.py
+# WhiteNoise middleware that can also run in an async (ASGI) middleware stack.
+#
+# WhiteNoise's own middleware is synchronous only, and a single synchronous middleware
+# makes Django run everything below it, including async views, through thread hand-offs.
+# Finding a static file is a dictionary lookup, so it is safe to do on the event loop.
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    '''WhiteNoiseMiddleware for both WSGI and ASGI.'''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        '''Serve a static file, or pass the request on to the rest of the async stack.'''
+        if self.autorefresh:
+            # looks at the filesystem
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
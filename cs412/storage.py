@@ -0,0 +1,137 @@
+## cs412/storage.py
+# Content-addressed, deduplicating file storage for uploaded images
+# (mini_fb.Image.image_file and blog.Article.image_file).
+#
+# Each upload is hashed (SHA-256) while it is streamed to disk and stored as
+# content/<first two hex digits>/<hash><ext>, so identical uploads share one file
+# instead of getting a random suffix.  A file is only deleted once no row of any
+# model that uses this storage refers to it any more (see release_files).
+#
+# Reusing a stored file touches it, and release() will not delete a file touched less
+# than settings.MEDIA_RELEASE_GRACE_SECONDS ago: an identical upload whose row has not
+# committed yet can not be counted, so the recent touch is what keeps its file alive.
+# Files spared that way are deleted later by collect() (manage.py dedupe_media --collect).
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import FileField
+from django.dispatch import Signal
+from django.utils.deconstruct import deconstructible
+
+#directory (inside the storage location) the content-addressed files are stored in
+CONTENT_DIR = 'content'
+#directory uploads are streamed into before they are moved to their final name
+TMP_DIR = 'tmp'
+#sent with storage and name after release() deletes a stored file, so that files
+#derived from it (mini_fb renditions) can be deleted as well
+file_released = Signal()
+
+def content_name(digest, ext):
+    '''Return the storage name for a file with this SHA-256 hex digest and extension.'''
+    return f'{CONTENT_DIR}/{digest[:2]}/{digest}{ext.lower()}'
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    '''A FileSystemStorage that names every file after the hash of its content.'''
+
+    def get_available_name(self, name, max_length=None):
+        '''Return name unchanged: _save picks the real (hash-based) name, and an existing
+        file with that name already holds the same bytes.'''
+        return name
+
+    def _save(self, name, content):
+        '''Stream content into a temporary file while hashing it, then move it to its
+        content-addressed name, or drop it if that content is already stored.'''
+        ext = os.path.splitext(name)[1]
+        tmp_dir = self.path(TMP_DIR)
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=ext)
+        try:
+            sha = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as out:
+                if hasattr(content, 'seek') and content.seekable():
+                    content.seek(0)
+                for chunk in content.chunks():
+                    sha.update(chunk)
+                    out.write(chunk)
+            final_name = content_name(sha.hexdigest(), ext)
+            final_path = self.path(final_name)
+            try:
+                # same content is already stored: share it, and mark it as in use (see release())
+                os.utime(final_path)
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                # atomic, so a concurrent identical upload just replaces it with the same bytes
+                os.replace(tmp_path, final_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(final_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return final_name
+
+def content_addressed_fields():
+    '''Return a list of (model, field) for every FileField stored in a ContentAddressedStorage.'''
+    return [(model, field)
+            for model in apps.get_models()
+            for field in model._meta.get_fields()
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)]
+
+def count_references(name):
+    '''Return how many rows (across every content-addressed field) refer to the file called name.'''
+    return sum(model._default_manager.filter(**{field.name: name}).count()
+               for model, field in content_addressed_fields())
+
+def release_files(sender, instance, **kwargs):
+    '''post_delete receiver: delete the instance's content-addressed files that nothing refers to any more.'''
+    for field in instance._meta.get_fields():
+        if not (isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)):
+            continue
+        file = getattr(instance, field.name)
+        if file:
+            # wait for the delete to commit, so a rollback cannot leave a row pointing at a missing file
+            transaction.on_commit(lambda name=file.name, storage=field.storage: release(storage, name))
+
+def release(storage, name):
+    '''Delete the file called name from storage if no row refers to it and no upload reused
+    it recently; return whether it was deleted.'''
+    if count_references(name) or not storage.exists(name):
+        return False
+    path = storage.path(name)
+    # move the file out of the way first: an upload of the same content from now on
+    # stores a fresh copy, and one from before has touched it (checked below)
+    os.makedirs(storage.path(TMP_DIR), exist_ok=True)
+    doomed = storage.path(f'{TMP_DIR}/released-{uuid.uuid4().hex}')
+    try:
+        os.rename(path, doomed)
+    except FileNotFoundError:
+        return False
+    if time.time() - os.stat(doomed).st_mtime < settings.MEDIA_RELEASE_GRACE_SECONDS or count_references(name):
+        # still (or again) in use: put it back (a newer identical copy holds the same bytes)
+        os.replace(doomed, path)
+        return False
+    os.remove(doomed)
+    file_released.send(sender=type(storage), storage=storage, name=name)
+    return True
+
+def collect(storage):
+    '''Release every content-addressed file in storage that no row refers to; return their names.'''
+    released = []
+    root = storage.path(CONTENT_DIR)
+    for directory, subdirectories, files in os.walk(root):
+        for file in files:
+            name = os.path.relpath(os.path.join(directory, file), storage.path('')).replace(os.sep, '/')
+            if release(storage, name):
+                released.append(name)
+    return released
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,77 @@
+## cs412/testing.py
+# Test helpers shared by the apps' tests.py files.
+#
+# QueryPlanTestMixin.assertNoFullScans renders a page, runs EXPLAIN QUERY PLAN on every
+# SELECT it issued, and fails if SQLite had to read a whole table to answer one of them.
+#
+# TemporaryMediaMixin gives a test class its own MEDIA_ROOT and removes it afterwards.
+import re
+import shutil
+import tempfile
+import unittest
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+#a plan step that reads every row of a table; "SCAN t USING [COVERING] INDEX i" walks an index instead
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+
+def explain(sql):
+    '''Return the detail lines of SQLite's query plan for sql.'''
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+def full_scans(sql):
+    '''Return the names of the tables sql reads in full.'''
+    return [match.group(1) for match in map(FULL_SCAN_RE.match, explain(sql)) if match]
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'query plans are only checked on SQLite')
+class QueryPlanTestMixin:
+    '''Mixin for TestCase classes that check the query plans of their views.'''
+
+    def assertNoFullScans(self, url, allowed=()):
+        '''GET url and fail if any of its SELECTs scans a whole table, other than the tables in allowed.'''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        problems = []
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            tables = [table for table in full_scans(sql) if table not in allowed]
+            if tables:
+                problems.append(f'{", ".join(tables)}: {sql}')
+        if problems:
+            self.fail(f'{url} scans whole tables:\n' + '\n'.join(problems))
+        return response
+
+class TemporaryMediaMixin:
+    '''Mixin for test classes that write uploads: MEDIA_ROOT is a new temporary directory
+    while the class runs, deleted in tearDownClass. media_settings are overridden along with it.'''
+
+    media_settings = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        # enabled before super().setUpClass(), so setUpTestData already uploads into media_root
+        cls._media_override = override_settings(MEDIA_ROOT=cls.media_root, **cls.media_settings)
+        cls._media_override.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls._remove_media()
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._remove_media()
+
+    @classmethod
+    def _remove_media(cls):
+        cls._media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
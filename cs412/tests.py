@@ -0,0 +1,137 @@
+## cs412/tests.py
+# Tests for the project-wide modules in cs412/
+import os
+import unittest
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import BadRequest
+from django.db.models.functions import Lower
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .media import parse_range
+from .pagination import decode_cursor, encode_cursor, keyset_page, sorted_page
+from .testing import TemporaryMediaMixin
+
+class KeysetPageTest(TestCase):
+    '''Following the cursors visits every row once, in order, even when sort keys are tied.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create([User(username=f'user{i}', last_name=f'Name{i % 4}') for i in range(23)])
+        # runs of rows share a timestamp, so the pk has to break the ties
+        for i, user in enumerate(User.objects.order_by('id')):
+            User.objects.filter(pk=user.pk).update(date_joined=user.date_joined.replace(microsecond=0, second=i // 5))
+
+    def walk(self, next_page):
+        '''Return every row visited by calling next_page(cursor) until it returns no cursor.'''
+        rows, cursor = next_page(None)
+        visited = list(rows)
+        while cursor:
+            rows, cursor = next_page(cursor)
+            visited += rows
+        return visited
+
+    def test_keyset_pages(self):
+        visited = self.walk(lambda cursor: keyset_page(User.objects.all(), cursor, 'date_joined', page_size=4))
+        self.assertEqual(visited, list(User.objects.order_by('-date_joined', '-id')))
+
+    def test_sorted_pages(self):
+        visited = self.walk(lambda after: sorted_page(User.objects.all(), Lower('last_name'), after, page_size=4))
+        self.assertEqual(visited, list(User.objects.order_by(Lower('last_name'), 'id')))
+
+    def test_cursor_round_trip(self):
+        user = User.objects.first()
+        self.assertEqual(decode_cursor(encode_cursor(user.date_joined, user.pk)), (user.date_joined, user.pk))
+
+    def test_malformed_cursors(self):
+        for cursor in ['x', '12', '-', '1-x', 'x-1', '9' * 30 + '-1']:
+            with self.assertRaises(BadRequest, msg=cursor):
+                keyset_page(User.objects.all(), cursor, 'date_joined')
+        for after in ['x', '1.5', '-', str(User.objects.order_by('-id').first().pk + 1)]:
+            with self.assertRaises(BadRequest, msg=after):
+                sorted_page(User.objects.all(), Lower('last_name'), after)
+
+class ParseRangeTest(unittest.TestCase):
+    '''Range headers become inclusive (start, end) offsets, None (send everything) or False (416).'''
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=100-', 1000), (100, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+        self.assertEqual(parse_range('bytes=900-5000', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes = 1-2', 1000), (1, 2))
+
+    def test_unsatisfiable(self):
+        self.assertIs(parse_range('bytes=1000-', 1000), False)
+        self.assertIs(parse_range('bytes=5-4', 1000), False)
+        self.assertIs(parse_range('bytes=-0', 1000), False)
+
+    def test_whole_file(self):
+        for header in [None, '', 'bytes=-', 'bytes=0-1,5-6', 'items=0-1', 'bytes=a-b']:
+            self.assertIsNone(parse_range(header, 1000), header)
+
+class ServeMediaTest(TemporaryMediaMixin, SimpleTestCase):
+    '''serve_media answers conditional and range requests, and hides unfinished uploads.'''
+
+    media_settings = {'MEDIA_SENDFILE': None, 'MEDIA_URL': '/media/'}
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        for name in ['photo.bin', 'tmp/upload.bin', 'dir with space/é.bin']:
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(self.content)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_and_partial(self):
+        response = self.client.get('/media/photo.bin')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        response = self.client.get('/media/photo.bin', headers={'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(self.body(response), self.content[10:20])
+
+        response = self.client.get('/media/photo.bin', headers={'Range': 'bytes=-4'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.content[-4:])
+
+        response = self.client.get('/media/photo.bin', headers={'Range': f'bytes={len(self.content)}-'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_not_modified(self):
+        response = self.client.get('/media/photo.bin')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        response = self.client.get('/media/photo.bin', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get('/media/photo.bin', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/media/photo.bin', headers={'If-None-Match': '"other"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_range(self):
+        etag = self.client.get('/media/photo.bin')['ETag']
+        response = self.client.get('/media/photo.bin', headers={'Range': 'bytes=0-0', 'If-Range': etag})
+        self.assertEqual(response.status_code, 206)
+        response = self.client.get('/media/photo.bin', headers={'Range': 'bytes=0-0', 'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_unfinished_uploads_are_hidden(self):
+        self.assertEqual(self.client.get('/media/tmp/upload.bin').status_code, 404)
+        self.assertEqual(self.client.get('/media/dir/../tmp/upload.bin').status_code, 404)
+        self.assertEqual(self.client.get('/media/tmp').status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_accel_redirect_is_quoted(self):
+        response = self.client.get('/media/dir%20with%20space/%C3%A9.bin')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/dir%20with%20space/%C3%A9.bin')
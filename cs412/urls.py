@@ -14,11 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from .media import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('pages.urls')),
@@ -28,8 +32,14 @@ urlpatterns = [
     path('formdata/', include('formdata.urls')),
     path('blog/', include('blog.urls')), # include the URLs from our blog project's urls.py file
     path('mini_fb/', include('mini_fb.urls')), # include the URLs from our blog project's urls.py file
+    path('search/', include('search.urls')), # full-text search over mini_fb and blog
 ]
 
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+# with manifest storage WhiteNoise serves the collected static files before any view runs
+if not settings.STATIC_MANIFEST:
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# user uploads, with conditional GET, byte ranges and optional X-Accel-Redirect/X-Sendfile offload
+urlpatterns += [
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media),
+]
@@ -0,0 +1,22 @@
+## mini_fb/backends.py
+# Authentication backend that loads the logged-in User together with their mini_fb Profile.
+from django.contrib.auth.backends import ModelBackend
+
+from .models import Profile
+
+class ProfileBackend(ModelBackend):
+    '''ModelBackend whose get_user() (run once per request by AuthenticationMiddleware)
+    fetches the User and their first Profile with one joined query.
+    The Profile is kept on the user as _profile_cache for CurrentProfileMiddleware.'''
+
+    def get_user(self, user_id):
+        profile = Profile.objects.select_related('user').filter(user_id=user_id).order_by('pk').first()
+        if profile is None:
+            # users without a Profile (e.g. blog-only accounts)
+            user = super().get_user(user_id)
+            if user is not None:
+                user._profile_cache = None
+            return user
+        user = profile.user
+        user._profile_cache = profile
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,122 @@
+## mini_fb/caching.py
+# Read-through cache (settings.CACHES) for the data behind the profile pages:
+# Profile rows, each profile's set of friend ids, and the first page of each
+# profile's status messages (with their images).
+# Entries are deleted by mini_fb/signals.py when a Profile, Friend, StatusMessage
+# or Image is saved or deleted; hits and misses are counted per kind (see stats()).
+#
+# Only pages read from here. Anything that writes from friend lists (the news feed
+# fan-out, backfill and rebuild in mini_fb/feed.py) reads Friend rows directly.
+# The deletes reach the processes that share the cache. With the default locmem backend
+# every process has its own, so with several workers a page can be stale for up to
+# MINI_FB_CACHE_TIMEOUT; deploy those with CACHE_BACKEND=redis or file
+# (manage.py check --deploy warns about this, see cs412/checks.py).
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from cs412.routers import use_primary
+
+PROFILE = 'profile'
+FRIEND_IDS = 'friend_ids'
+STATUS_PAGE = 'status_page'
+KINDS = (PROFILE, FRIEND_IDS, STATUS_PAGE)
+
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+def make_key(kind, profile_id):
+    '''Return the cache key of one kind of entry for the Profile with this id.'''
+    return f'mini_fb:{kind}:{profile_id}'
+
+def _count(kind, hits, misses):
+    '''Add to the hit and miss counters of kind.'''
+    with _counts_lock:
+        _counts[kind, 'hits'] += hits
+        _counts[kind, 'misses'] += misses
+
+def stats():
+    '''Return {kind: {hits, misses, hit_rate}} for this process since it started (or reset_stats()).'''
+    with _counts_lock:
+        counts = dict(_counts)
+    result = {}
+    for kind in KINDS:
+        hits, misses = counts.get((kind, 'hits'), 0), counts.get((kind, 'misses'), 0)
+        result[kind] = {'hits': hits, 'misses': misses,
+                        'hit_rate': hits / (hits + misses) if hits + misses else None}
+    return result
+
+def reset_stats():
+    '''Zero the hit and miss counters.'''
+    with _counts_lock:
+        _counts.clear()
+
+def get_many(kind, profile_ids, load):
+    '''Return {profile_id: value} for profile_ids, reading the cache first and calling
+    load(missing_ids) -> {profile_id: value} for the rest (which are then cached).'''
+    profile_ids = list(profile_ids)
+    keys = {make_key(kind, pk): pk for pk in profile_ids}
+    found = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [pk for pk in profile_ids if pk not in found]
+    _count(kind, len(found), len(missing))
+    if missing:
+        # fill from the primary, so a lagging read replica can not put stale rows in the cache
+        with use_primary():
+            loaded = load(missing)
+        cache.set_many({make_key(kind, pk): value for pk, value in loaded.items()},
+                       settings.MINI_FB_CACHE_TIMEOUT)
+        found.update(loaded)
+    return found
+
+def get_one(kind, profile_id, load):
+    '''Return the cached value for one profile, calling load(profile_id) on a miss (None is not cached).'''
+    return get_many(kind, [profile_id],
+                    lambda ids: {pk: value for pk in ids if (value := load(pk)) is not None}).get(profile_id)
+
+def get_profile(profile_id):
+    '''Return the Profile with this id (None if there is none).'''
+    from .models import Profile
+    return get_one(PROFILE, profile_id, lambda pk: Profile.objects.filter(pk=pk).first())
+
+def get_profiles(profile_ids):
+    '''Return {id: Profile} for the profiles with these ids that exist.'''
+    from .models import Profile
+    return get_many(PROFILE, profile_ids, Profile.objects.in_bulk)
+
+def get_friend_id_sets(profile_ids):
+    '''Return {id: frozenset of friend ids} for these profile ids.'''
+    from .models import Friend
+    def load(ids):
+        friend_ids = {pk: set() for pk in ids}
+        pairs = Friend.objects.filter(Q(profile1__in=ids) | Q(profile2__in=ids)).values_list('profile1', 'profile2')
+        for p1, p2 in pairs:
+            if p1 in friend_ids:
+                friend_ids[p1].add(p2)
+            if p2 in friend_ids:
+                friend_ids[p2].add(p1)
+        return {pk: frozenset(friends) for pk, friends in friend_ids.items()}
+    return get_many(FRIEND_IDS, profile_ids, load)
+
+def get_friend_ids(profile_id):
+    '''Return the frozenset of the ids of this profile's friends.'''
+    return get_friend_id_sets([profile_id])[profile_id]
+
+def get_friend_profiles(profile_id):
+    '''Return a list of the Profiles of this profile's friends, ordered by id.'''
+    friends = get_profiles(get_friend_ids(profile_id))
+    return [friends[f] for f in sorted(friends)]
+
+def get_status_page(profile_id, load):
+    '''Return the first page of a profile's status messages, as computed by load().'''
+    return get_one(STATUS_PAGE, profile_id, lambda pk: load())
+
+def invalidate(profile_ids, kinds=KINDS):
+    '''Delete the given kinds of entries for these profiles, now and again when the current
+    transaction commits (so a request that read the old rows meanwhile can not re-cache them).'''
+    keys = [make_key(kind, pk) for pk in profile_ids for kind in kinds]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,80 @@
+## mini_fb/feed.py
+# Fan-out-on-write maintenance of the materialized news feed (NewsFeedItem).
+# Each function here is called from mini_fb/signals.py or the feed management commands.
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from .models import StatusMessage, NewsFeedItem
+
+#rows per INSERT when bulk creating feed items
+BATCH_SIZE = 500
+
+def fan_out_status_message(status_message):
+    '''Add a newly created StatusMessage to the feed of its author and every friend of the author.'''
+    owner_ids = status_message.profile.get_friend_ids()
+    owner_ids.add(status_message.profile_id)
+    items = [NewsFeedItem(owner_id=owner_id,
+                          status_message=status_message,
+                          timestamp=status_message.timestamp)
+             for owner_id in owner_ids]
+    NewsFeedItem.objects.bulk_create(items, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+def refresh_status_message(status_message):
+    '''Copy an edited StatusMessage's new timestamp onto its feed items.'''
+    NewsFeedItem.objects.filter(status_message=status_message).update(timestamp=status_message.timestamp)
+
+def _copy_messages_to_feed(author_id, owner_id):
+    '''Add every StatusMessage written by author_id to the feed of owner_id.'''
+    messages = StatusMessage.objects.filter(profile_id=author_id).values_list('id', 'timestamp')
+    items = [NewsFeedItem(owner_id=owner_id, status_message_id=pk, timestamp=timestamp)
+             for pk, timestamp in messages.iterator()]
+    NewsFeedItem.objects.bulk_create(items, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+def add_friendship(profile1_id, profile2_id):
+    '''Merge two new friends' messages into each other's feeds.'''
+    with transaction.atomic():
+        _copy_messages_to_feed(profile1_id, profile2_id)
+        _copy_messages_to_feed(profile2_id, profile1_id)
+
+def remove_friendship(profile1_id, profile2_id):
+    '''Remove two former friends' messages from each other's feeds.'''
+    with transaction.atomic():
+        NewsFeedItem.objects.filter(owner_id=profile1_id, status_message__profile_id=profile2_id).delete()
+        NewsFeedItem.objects.filter(owner_id=profile2_id, status_message__profile_id=profile1_id).delete()
+
+def expected_feed(profile):
+    '''Return the set of StatusMessage ids that should be in this profile's feed.'''
+    author_ids = profile.get_friend_ids()
+    author_ids.add(profile.id)
+    return set(StatusMessage.objects.filter(profile_id__in=author_ids).values_list('id', flat=True))
+
+def backfill_feed(profile):
+    '''Insert any missing items into a profile's feed, leaving existing rows alone.
+    Return the number of items added.'''
+    before = NewsFeedItem.objects.filter(owner=profile).count()
+    with transaction.atomic():
+        for author_id in profile.get_friend_ids() | {profile.id}:
+            _copy_messages_to_feed(author_id, profile.id)
+    return NewsFeedItem.objects.filter(owner=profile).count() - before
+
+def rebuild_feed(profile, fix=True):
+    '''Compare a profile's materialized feed against its friends' messages.
+    Return a tuple (missing, extra, stale) of counts; when fix is True the missing rows
+    are inserted, the extra rows deleted and the stale timestamps refreshed.'''
+    expected = expected_feed(profile)
+    actual = set(NewsFeedItem.objects.filter(owner=profile).values_list('status_message_id', flat=True))
+    missing = expected - actual
+    extra = actual - expected
+    stale = NewsFeedItem.objects.filter(owner=profile).exclude(timestamp=F('status_message__timestamp'))
+    stale_count = stale.count()
+    if fix:
+        with transaction.atomic():
+            NewsFeedItem.objects.filter(owner=profile, status_message_id__in=extra).delete()
+            messages = StatusMessage.objects.filter(id__in=missing).values_list('id', 'timestamp')
+            items = [NewsFeedItem(owner=profile, status_message_id=pk, timestamp=timestamp)
+                     for pk, timestamp in messages.iterator()]
+            NewsFeedItem.objects.bulk_create(items, batch_size=BATCH_SIZE, ignore_conflicts=True)
+            if stale_count:
+                message_timestamp = StatusMessage.objects.filter(pk=OuterRef('status_message_id')).values('timestamp')[:1]
+                NewsFeedItem.objects.filter(owner=profile).update(timestamp=Subquery(message_timestamp))
+    return len(missing), len(extra), stale_count
@@ -0,0 +1,17 @@
+## mini_fb/management/commands/backfill_news_feed.py
+# Fill in missing items of the materialized news feed. Migration 0011 fills the feeds once when
+# the table is created; this re-runs that, e.g. after restoring StatusMessages or Friends from a backup.
+from django.core.management.base import BaseCommand
+
+from mini_fb.models import Profile
+from mini_fb import feed
+
+class Command(BaseCommand):
+    '''Insert every missing NewsFeedItem; existing rows are left alone, so it is safe to re-run.'''
+    help = 'Backfill the materialized news feed (NewsFeedItem) for every Profile.'
+
+    def handle(self, *args, **options):
+        total = 0
+        for profile in Profile.objects.only('id').iterator():
+            total += feed.backfill_feed(profile)
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total} news feed items.'))
@@ -0,0 +1,150 @@
+## mini_fb/management/commands/bench_asgi.py
+# Compare the latency of the mini_fb profile page and news feed under concurrency when
+# served through WSGI (sync views, one thread per request) and through ASGI (the async
+# views in mini_fb/views.py). Each mode runs in its own process, since the URLs pick
+# their views at startup (settings.MINI_FB_ASYNC_VIEWS).
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from mini_fb.models import Profile
+
+MODES = {'wsgi': '0', 'asgi': '1'}
+
+class Status:
+    '''The part of a response the benchmark checks.'''
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+async def asgi_get(application, path, cookie):
+    '''Send a GET request for path through an ASGI application; return its Status.'''
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'root_path': '', 'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+             'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())]}
+    messages = []
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if body_sent:
+            # the client never disconnects; Django cancels this wait once the response is sent
+            await asyncio.Future()
+        body_sent = True
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return Status(messages[0]['status'])
+
+class Command(BaseCommand):
+    '''Run the same request mix through WSGI and ASGI and print latency percentiles.'''
+    help = 'Benchmark mini_fb profile/news feed latency under concurrency: WSGI (sync views) against ASGI (async views).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8],
+                            help='Numbers of concurrent clients to run (default: 1 8).')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per client.')
+        parser.add_argument('--db-latency', type=float, default=0,
+                            help='Milliseconds to add to every query, to simulate a database on another machine.')
+        parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.run_worker(options)
+            return
+
+        self.stdout.write(f'{"mode":>6} {"clients":>8} {"p50 (ms)":>10} {"p95 (ms)":>10} {"req/s":>10}')
+        for concurrency in options['concurrency']:
+            for mode, async_views in MODES.items():
+                command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_asgi', '--worker', mode,
+                           '--concurrency', str(concurrency), '--requests', str(options['requests']),
+                           '--db-latency', str(options['db_latency'])]
+                result = subprocess.run(command, env={**os.environ, 'MINI_FB_ASYNC_VIEWS': async_views},
+                                        capture_output=True, text=True)
+                if result.returncode:
+                    raise CommandError(f'{mode}: {result.stderr.strip()}')
+                stats = json.loads(result.stdout.strip().splitlines()[-1])
+                self.stdout.write(f'{mode:>6} {concurrency:>8} {stats["p50"]:>10.2f} {stats["p95"]:>10.2f} '
+                                  f'{stats["rps"]:>10.1f}')
+
+    def run_worker(self, options):
+        '''Time the requests of one mode and print the statistics as JSON.'''
+        profile = Profile.objects.select_related('user').exclude(user=None).first()
+        if profile is None:
+            raise CommandError('There are no Profiles with a User to benchmark with.')
+        urls = [reverse('show_profile', kwargs={'pk': profile.pk}), reverse('news_feed')]
+        concurrency, requests = options['concurrency'][0], options['requests']
+
+        if options['db_latency']:
+            delay = options['db_latency'] / 1000
+
+            def slow_execute(execute, sql, params, many, context):
+                time.sleep(delay)
+                return execute(sql, params, many, context)
+
+            def add_latency(sender, connection, **kwargs):
+                if slow_execute not in connection.execute_wrappers:
+                    connection.execute_wrappers.append(slow_execute)
+            connection_created.connect(add_latency, weak=False)
+
+        def check(url, response):
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+
+        def sync_client():
+            client = Client()
+            client.force_login(profile.user)
+            latencies = []
+            for n in range(requests):
+                url = urls[n % len(urls)]
+                start = time.perf_counter()
+                check(url, client.get(url))
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        async def async_client():
+            # the real ASGI handler (AsyncClient would run every request's sync parts on one thread)
+            latencies = []
+            for n in range(requests):
+                url = urls[n % len(urls)]
+                start = time.perf_counter()
+                check(url, await asgi_get(application, url, cookie))
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        async def run_async():
+            return await asyncio.gather(*(async_client() for i in range(concurrency)))
+
+        login = Client()
+        login.force_login(profile.user)
+        cookie = '; '.join(f'{name}={morsel.value}' for name, morsel in login.cookies.items())
+        application = get_asgi_application()
+
+        start = time.perf_counter()
+        if options['worker'] == 'asgi':
+            results = asyncio.run(run_async())
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(lambda i: sync_client(), range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for result in results for latency in result)
+        self.stdout.write(json.dumps({'p50': statistics.median(latencies),
+                                      'p95': latencies[int(len(latencies) * 0.95) - 1],
+                                      'rps': len(latencies) / elapsed}))
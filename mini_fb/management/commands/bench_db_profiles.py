@@ -0,0 +1,124 @@
+## mini_fb/management/commands/bench_db_profiles.py
+# Measure requests per second of the mini_fb pages under each database profile
+# (settings.DB_PROFILE). Every profile is run in its own process, since the database
+# settings can only be chosen at startup.
+#
+# The requests go over HTTP to a WSGI server with a fixed pool of threads (like gunicorn's
+# gthread workers), so that connections are opened and closed exactly as in production:
+# Django's request_started/request_finished signals close them after each request unless
+# CONN_MAX_AGE keeps them, and a kept connection is reused by its thread's next request.
+# (django.test.Client disconnects those signals, so it can not measure this.)
+import argparse
+import http.client
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from mini_fb.models import Profile
+
+class QuietHandler(WSGIRequestHandler):
+    '''A WSGIRequestHandler that does not log every request.'''
+    def log_message(self, format, *args):
+        pass
+
+class PooledWSGIServer(WSGIServer):
+    '''A WSGIServer that handles each connection on one of a fixed pool of threads.'''
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='bench-wsgi')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    process_request_thread = socketserver.ThreadingMixIn.process_request_thread
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+class Command(BaseCommand):
+    '''Run the same request mix under each DB_PROFILE and print the requests per second.'''
+    help = 'Benchmark the mini_fb views (requests/second) under several DB_PROFILE settings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=['dev', 'sqlite'],
+                            help='DB_PROFILE values to compare (default: dev sqlite).')
+        parser.add_argument('--requests', type=int, default=300, help='Requests per client thread.')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent clients, and server threads.')
+        parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options['requests'], options['threads'])))
+            return
+
+        self.stdout.write(f'{"profile":>10} {"req/s":>10} {"requests":>10} {"connects":>10}')
+        for profile in options['profiles']:
+            command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_db_profiles', '--worker',
+                       '--requests', str(options['requests']), '--threads', str(options['threads'])]
+            result = subprocess.run(command, env={**os.environ, 'DB_PROFILE': profile},
+                                    capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(f'{profile}: {result.stderr.strip()}')
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            self.stdout.write(f'{profile:>10} {stats["rps"]:>10.1f} {stats["requests"]:>10} {stats["connects"]:>10}')
+
+    def run_worker(self, requests, threads):
+        '''Serve the site on a local port and request it from several client threads;
+        return the throughput and the number of database connections opened.'''
+        profile = Profile.objects.select_related('user').exclude(user=None).first()
+        if profile is None:
+            raise CommandError('There are no Profiles with a User to benchmark with.')
+        urls = [reverse('show_all'),
+                reverse('show_profile', kwargs={'pk': profile.pk}),
+                reverse('news_feed')]
+        login = Client()
+        login.force_login(profile.user)
+        cookie = '; '.join(f'{name}={morsel.value}' for name, morsel in login.cookies.items())
+
+        connects = [0]
+        connects_lock = threading.Lock()
+        def count_connect(sender, connection, **kwargs):
+            with connects_lock:
+                connects[0] += 1
+        connection_created.connect(count_connect, weak=False)
+
+        server = PooledWSGIServer(('127.0.0.1', 0), threads)
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+
+        def client_thread(i):
+            for n in range(requests):
+                url = urls[n % len(urls)]
+                conn = http.client.HTTPConnection(host, port)
+                conn.request('GET', url, headers={'Cookie': cookie})
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status != 200:
+                    raise CommandError(f'{url} returned {response.status}')
+
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(client_thread, range(threads)))
+            elapsed = time.perf_counter() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+        return {'rps': requests * threads / elapsed, 'requests': requests * threads, 'connects': connects[0]}
@@ -0,0 +1,78 @@
+## mini_fb/management/commands/dedupe_media.py
+# Move existing uploads (mini_fb Images and blog Articles) into the content-addressed
+# storage (cs412/storage.py), so that identical files are stored once, and rewrite
+# the rows to point at the new names. With --collect, delete the stored files (and
+# their renditions) that no row refers to any more.
+import hashlib
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from cs412.storage import CONTENT_DIR, collect, content_addressed_fields, release
+from mini_fb.models import Image
+
+class Command(BaseCommand):
+    '''Deduplicate the media tree by content hash.'''
+    help = 'Move uploaded images into content-addressed storage, sharing identical files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report which files have identical content.')
+        parser.add_argument('--keep-originals', action='store_true',
+                            help='Do not delete the old files once nothing refers to them.')
+        parser.add_argument('--collect', action='store_true',
+                            help='Only delete stored files that nothing refers to any more.')
+
+    def handle(self, *args, **options):
+        if options['collect']:
+            storages = {field.storage.path(''): field.storage for model, field in content_addressed_fields()}
+            released = [name for storage in storages.values() for name in collect(storage)]
+            self.stdout.write(self.style.SUCCESS(f'Deleted {len(released)} unreferenced files.'))
+            return
+
+        old_names = set()
+        by_hash = defaultdict(set)
+        rewritten = 0
+        for model, field in content_addressed_fields():
+            storage = field.storage
+            rows = model._default_manager.exclude(**{field.name: ''}).only('pk', field.name)
+            for row in rows.iterator():
+                name = getattr(row, field.name).name
+                if name.startswith(f'{CONTENT_DIR}/'):
+                    continue
+                if not storage.exists(name):
+                    self.stderr.write(f'{model.__name__} {row.pk}: {name} is missing, skipped')
+                    continue
+                if options['dry_run']:
+                    with storage.open(name) as f:
+                        sha = hashlib.sha256()
+                        for chunk in f.chunks():
+                            sha.update(chunk)
+                    by_hash[sha.hexdigest()].add(name)
+                    continue
+                # saving through the storage hashes the file and reuses an identical stored copy
+                with storage.open(name) as f:
+                    new_name = storage.save(name, f)
+                model._default_manager.filter(pk=row.pk).update(**{field.name: new_name})
+                if model is Image:
+                    # renditions are named after the original; make them again for the new name
+                    Image.objects.filter(pk=row.pk).update(renditions_ready=False)
+                old_names.add((storage, name))
+                by_hash[new_name].add(name)
+                rewritten += 1
+
+        if options['dry_run']:
+            for digest, names in sorted(by_hash.items()):
+                if len(names) > 1:
+                    self.stdout.write(f'{digest[:12]}: {", ".join(sorted(names))}')
+            self.stdout.write(f'{sum(len(n) for n in by_hash.values())} files would become {len(by_hash)}.')
+            return
+
+        deleted = 0
+        if not options['keep_originals']:
+            for storage, name in old_names:
+                # release() re-checks the references and deletes the old renditions too
+                deleted += release(storage, name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rewrote {rewritten} rows onto {len(by_hash)} stored files; deleted {deleted} old files. '
+            f'Run generate_thumbnails to rebuild the mini_fb renditions.'))
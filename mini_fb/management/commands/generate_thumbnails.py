@@ -0,0 +1,28 @@
+## mini_fb/management/commands/generate_thumbnails.py
+# Make the thumbnail/medium renditions for Images uploaded before renditions existed
+# (or whose background generation failed).
+from django.core.management.base import BaseCommand
+
+from mini_fb.models import Image
+from mini_fb import thumbnails
+
+class Command(BaseCommand):
+    '''Generate missing renditions synchronously.'''
+    help = 'Generate the WebP/JPEG thumbnail and medium renditions for mini_fb Images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate renditions that already exist too.')
+
+    def handle(self, *args, **options):
+        images = Image.objects.exclude(image_file='')
+        if not options['all']:
+            images = images.filter(renditions_ready=False)
+        done = failed = 0
+        for image in images.iterator():
+            try:
+                thumbnails.make_renditions(image)
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Image {image.pk} ({image.image_file.name}): {e}')
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {done} images ({failed} failed).'))
@@ -0,0 +1,31 @@
+## mini_fb/management/commands/rebuild_news_feed.py
+# Check the materialized news feed against the StatusMessage and Friend tables, and repair it.
+from django.core.management.base import BaseCommand, CommandError
+
+from mini_fb.models import Profile
+from mini_fb import feed
+
+class Command(BaseCommand):
+    '''Recompute every Profile's feed and report (and by default fix) any differences.'''
+    help = 'Verify and rebuild the materialized news feed (NewsFeedItem) for every Profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report inconsistencies; exit with an error if any are found.')
+        parser.add_argument('--profile', type=int, help='Only rebuild the feed of this Profile id.')
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.only('id')
+        if options['profile']:
+            profiles = profiles.filter(id=options['profile'])
+        fix = not options['check']
+        bad_profiles = 0
+        for profile in profiles.iterator():
+            missing, extra, stale = feed.rebuild_feed(profile, fix=fix)
+            if missing or extra or stale:
+                bad_profiles += 1
+                self.stdout.write(f'{profile.id}: missing={missing} extra={extra} stale={stale}')
+        if bad_profiles and not fix:
+            raise CommandError(f'{bad_profiles} news feeds are inconsistent.')
+        verb = 'Repaired' if fix else 'Checked'
+        self.stdout.write(self.style.SUCCESS(f'{verb} news feeds; {bad_profiles} needed changes.'))
@@ -0,0 +1,36 @@
+## mini_fb/middleware.py
+# Resolve the logged-in user's Profile once per request and expose it as request.profile.
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from .models import Profile
+
+def get_profile(request):
+    '''Return the Profile of the logged-in user (None if there is none), looking it up at most once per request.'''
+    if not hasattr(request, '_cached_profile'):
+        user = request.user
+        if not user.is_authenticated:
+            request._cached_profile = None
+        elif hasattr(user, '_profile_cache'):
+            # already loaded with the user by mini_fb.backends.ProfileBackend
+            request._cached_profile = user._profile_cache
+        else:
+            request._cached_profile = Profile.objects.filter(user=user).order_by('pk').first()
+    return request._cached_profile
+
+class CurrentProfileMiddleware:
+    '''Set request.profile to a lazy reference to the logged-in user's Profile.
+    Must come after django.contrib.auth.middleware.AuthenticationMiddleware.'''
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request))
+        # under ASGI this returns the coroutine of the rest of the (async) stack
+        return self.get_response(request)
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:24
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def backfill_feeds(apps, schema_editor):
+    '''Put every existing StatusMessage into the feed of its author and the author's friends,
+    as mini_fb/feed.py would have if the table had always existed (backfill_news_feed re-runs this).'''
+    Profile = apps.get_model('mini_fb', 'Profile')
+    Friend = apps.get_model('mini_fb', 'Friend')
+    StatusMessage = apps.get_model('mini_fb', 'StatusMessage')
+    NewsFeedItem = apps.get_model('mini_fb', 'NewsFeedItem')
+    # friendships are not canonical yet (0013): pairs may be reversed, repeated or a profile with itself
+    authors = defaultdict(set)
+    for profile_id in Profile.objects.values_list('id', flat=True).iterator():
+        authors[profile_id].add(profile_id)
+    for profile1_id, profile2_id in Friend.objects.values_list('profile1_id', 'profile2_id').iterator():
+        authors[profile1_id].add(profile2_id)
+        authors[profile2_id].add(profile1_id)
+    messages = defaultdict(list)
+    for pk, profile_id, timestamp in StatusMessage.objects.values_list('id', 'profile_id', 'timestamp').iterator():
+        messages[profile_id].append((pk, timestamp))
+    items = [NewsFeedItem(owner_id=owner_id, status_message_id=pk, timestamp=timestamp)
+             for owner_id, author_ids in authors.items()
+             for author_id in author_ids
+             for pk, timestamp in messages[author_id]]
+    NewsFeedItem.objects.bulk_create(items, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0010_profile_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsFeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='mini_fb.profile')),
+                ('status_message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='mini_fb.statusmessage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', '-timestamp', '-status_message'], name='feed_owner_timestamp_idx')],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'status_message'), name='unique_feed_item')],
+            },
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
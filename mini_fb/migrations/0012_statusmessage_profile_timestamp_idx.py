@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0011_newsfeeditem'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='statusmessage',
+            index=models.Index(fields=['profile', '-timestamp', '-id'], name='status_profile_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:26
+
+from django.db import migrations, models
+
+
+def canonicalize_friendships(apps, schema_editor):
+    '''Store every friendship once, with the smaller profile id in profile1.
+    Self-friendships and duplicate pairs (in either direction) are deleted, keeping the oldest row.'''
+    Friend = apps.get_model('mini_fb', 'Friend')
+    seen = set()
+    duplicates = []
+    for friend in Friend.objects.order_by('id'):
+        pair = (min(friend.profile1_id, friend.profile2_id), max(friend.profile1_id, friend.profile2_id))
+        if pair[0] == pair[1] or pair in seen:
+            duplicates.append(friend.id)
+            continue
+        seen.add(pair)
+        if (friend.profile1_id, friend.profile2_id) != pair:
+            Friend.objects.filter(id=friend.id).update(profile1_id=pair[0], profile2_id=pair[1])
+    Friend.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0012_statusmessage_profile_timestamp_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(canonicalize_friendships, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='friend',
+            index=models.Index(fields=['profile2', 'profile1'], name='friend_profile2_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='friend',
+            constraint=models.UniqueConstraint(fields=('profile1', 'profile2'), name='unique_friendship'),
+        ),
+        migrations.AddConstraint(
+            model_name='friend',
+            constraint=models.CheckConstraint(condition=models.Q(('profile1__lt', models.F('profile2'))), name='friendship_canonical_order'),
+        ),
+    ]
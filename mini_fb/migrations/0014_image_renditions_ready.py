@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0013_canonical_friendship'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='renditions_ready',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:31
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_fb', '0015_content_addressed_image_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(django.db.models.functions.text.Lower('lastName'), models.F('id'), name='profile_lastname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(django.db.models.functions.text.Lower('firstName'), name='profile_firstname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(django.db.models.functions.text.Lower('city'), django.db.models.functions.text.Lower('lastName'), name='profile_city_idx'),
+        ),
+    ]
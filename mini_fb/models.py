@@ -3,9 +3,21 @@
 # mini_fb/models.py
 # Define the data objects for our application
 #
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import Q, F
+from django.db.models.functions import Lower
 from django.urls import reverse
 from django.contrib.auth.models import User
+from cs412.storage import content_storage
+from . import caching, thumbnails
+from collections import Counter
+import heapq
+
+#default number of friend suggestions returned by Profile.get_friend_suggestions
+SUGGESTION_LIMIT = 10
+
+#sorts after any text that starts with a given prefix (used for indexed prefix searches)
+PREFIX_END = '\U0010ffff'
 
 #Each model is a class
 class Profile(models.Model): #class MUST inheirit 
@@ -19,16 +31,40 @@ class Profile(models.Model): #class MUST inheirit
     profileImageURL = models.URLField(blank=True)
     # foreign key to User model creating many-to-one Profile-to-User
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            #the profile directory is sorted by last name and searched by name/city prefix (case-insensitive)
+            models.Index(Lower('lastName'), F('id'), name='profile_lastname_idx'),
+            models.Index(Lower('firstName'), name='profile_firstname_idx'),
+            models.Index(Lower('city'), Lower('lastName'), name='profile_city_idx'),
+        ]
     
     #Default method so name MUST match (Admin can display this rather than the unique ID)
     def __str__(self):
         '''Return a string representation of this Profile object.'''
         return f'{self.firstName} {self.lastName}'
     
+    @staticmethod
+    def search(name='', city=''):
+        '''Return the Profiles whose first or last name starts with name and whose city
+        starts with city (ignoring case); empty strings match everything.'''
+        profiles = Profile.objects.alias(first=Lower('firstName'), last=Lower('lastName'), town=Lower('city'))
+        # prefix matches are written as ranges so they can use the Lower() indexes
+        if name:
+            name = name.lower()
+            profiles = profiles.filter(Q(first__gte=name, first__lt=name + PREFIX_END) |
+                                       Q(last__gte=name, last__lt=name + PREFIX_END))
+        if city:
+            city = city.lower()
+            profiles = profiles.filter(town__gte=city, town__lt=city + PREFIX_END)
+        return profiles
+
     #returns a list of all attached StatusMessages for a given profile
     def get_statusMessages(self):
         '''Return all of the statusMessages about this profile.'''
-        messages = StatusMessage.objects.filter(profile=self)
+        # the related manager returns prefetch_related('statusmessage_set') results without a query
+        messages = self.statusmessage_set.all()
         return messages
     
     #returns the URL which should be returned to when a profile is made
@@ -37,47 +73,88 @@ class Profile(models.Model): #class MUST inheirit
         return reverse('show_all')
     
 
+    def get_friend_ids(self):
+        '''Return a set of the ids of this profile's friends, excluding self.'''
+        # always from the database, never the cache: the feed fan-out and rebuild rely on it
+        #Friend rows are stored in canonical order (profile1 < profile2), so self may be in either column
+        pairs = Friend.objects.filter(Q(profile1=self) | Q(profile2=self)).values_list('profile1', 'profile2')
+        return {p2 if p1 == self.id else p1 for p1, p2 in pairs}
+
     def get_friends(self):
         '''Return a list of this profile's friends as Profile instances, excluding self.'''
-        #friends where self is profile1
-        friendsCaseOne = Friend.objects.filter(profile1=self).values_list('profile2', flat=True)
-        #friends where self is profile2
-        friendsCaseTwo = Friend.objects.filter(profile2=self).values_list('profile1', flat=True)
-            #QuereySet returns id as a list of tuples which does not work for comparrison (we should use a better pk for profiles)
-        
-        friend_ids = set(friendsCaseOne) | set(friendsCaseTwo)
-        friend_ids.discard(self.id)
-        # Retrieve the corresponding Profile objects and convert to a list of Profiles rather than a Querey Set
-        return list(Profile.objects.filter(id__in=friend_ids))
+        # filled by Profile.prefetch_friends() (or an earlier call) so templates can call this repeatedly
+        if not hasattr(self, '_friends_cache'):
+            self._friends_cache = caching.get_friend_profiles(self.id)
+        return self._friends_cache
+
+    @staticmethod
+    def prefetch_friends(profiles):
+        '''Load the friends of every Profile in profiles (from the cache, or with two queries),
+        so that get_friends() on each of them does not query the database.'''
+        profiles = list(profiles)
+        friend_ids = caching.get_friend_id_sets([p.id for p in profiles])
+        friends = caching.get_profiles({f for fs in friend_ids.values() for f in fs})
+        for p in profiles:
+            p._friends_cache = [friends[f] for f in sorted(friend_ids[p.id]) if f in friends]
+        return profiles
     
     def add_friend(self, other):
-        '''Add a friend relationship with another Profile instance.'''
+        '''Add a friend relationship with another Profile instance.
+        Return True if a new friendship was created; adding an existing friend (or self) does nothing.'''
         # Check that we're not trying to friend ourselves
-        invalidFriendship = Friend.objects.filter(profile1=self, profile2=other).exists() | Friend.objects.filter(profile1=other, profile2=self).exists()
-        if(self == other):
-            invalidFriendship = True
-
-        if not invalidFriendship:
-            newFriend = Friend.objects.create(profile1=self, profile2=other)
-            newFriend.save()
+        if self.id == other.id:
+            return False
+        # a single INSERT; the unique constraint on Friend makes a repeated (or concurrent) add a no-op
+        try:
+            with transaction.atomic():
+                Friend.objects.create(profile1=self, profile2=other)
+        except IntegrityError:
+            return False
+        # forget any cached friends list
+        self.__dict__.pop('_friends_cache', None)
+        other.__dict__.pop('_friends_cache', None)
+        return True
     
-    def get_friend_suggestions(self):
-        '''Return a list of profiles that are suggested friends with this profile'''
-        existingFriends = set(Friend.objects.filter(profile1=self).values_list('profile1_id', flat=True)) | set(Friend.objects.filter(profile2=self).values_list('profile2_id', flat=True))
-        suggestions = Profile.objects.exclude(id__in=existingFriends).exclude(id=self.id)
-        return list(suggestions)
+    def get_friend_suggestions(self, limit=SUGGESTION_LIMIT):
+        '''Return a list of up to limit profiles suggested as friends for this profile.
+        Friends-of-friends come first, ranked by how many mutual friends they share
+        (stored on each suggestion as mutual_friends); the rest of the list is filled
+        with other profiles that are not yet friends.'''
+        friend_ids = self.get_friend_ids()
+        excluded = friend_ids | {self.id}
+        # count mutual friends for every friend-of-friend, from the friends' cached friend-id sets
+        # (only the ranking can be stale; friends are excluded using the database)
+        mutual = Counter()
+        for friends_of_friend in caching.get_friend_id_sets(friend_ids).values():
+            mutual.update(friends_of_friend - excluded)
+        # highest mutual count first, ties broken by id
+        top = heapq.nsmallest(limit, mutual.items(), key=lambda item: (-item[1], item[0]))
+        profiles = caching.get_profiles([candidate_id for candidate_id, n in top])
+        suggestions = []
+        for candidate_id, n in top:
+            profile = profiles[candidate_id]
+            profile.mutual_friends = n
+            suggestions.append(profile)
+        # not enough friends-of-friends: fill up with other profiles
+        if len(suggestions) < limit:
+            others = Profile.objects.exclude(id__in=excluded | set(profiles)).order_by('id')[:limit - len(suggestions)]
+            for profile in others:
+                profile.mutual_friends = 0
+                suggestions.append(profile)
+        return suggestions
     
     def get_news_feed(self):
-        '''Return a list of StatusMessages for this Profile and its friends.'''
-        friendProfiles = self.get_friends()
-
-        # Include self in the list of IDs to get messages from self and friends
-        friendProfiles.append(self.id)  # Add self to the list
-
-        #ordered by desending timestamp
-        feed = StatusMessage.objects.filter(profile_id__in=friendProfiles).order_by('-timestamp')
+        '''Return the StatusMessages for this Profile and its friends, newest first.'''
+        # the feed is materialized in NewsFeedItem (filled on write by mini_fb/signals.py),
+        # so reading it is a single range scan over the (owner, timestamp) index
+        feed = (StatusMessage.objects.filter(feed_items__owner=self)
+                                     .order_by('-feed_items__timestamp', '-feed_items__status_message')
+                                     .select_related('profile'))
+        return feed
 
-        return list(feed)
+    def get_news_feed_items(self):
+        '''Return the NewsFeedItems of this Profile's feed, newest first.'''
+        return NewsFeedItem.objects.filter(owner=self).order_by('-timestamp', '-status_message')
 
 class StatusMessage(models.Model):
     '''Encapsulate the idea of a status message for some profile.'''
@@ -87,28 +164,102 @@ class StatusMessage(models.Model):
     timestamp = models.DateTimeField(auto_now=True)
     message = models.TextField(blank=False)
 
+    class Meta:
+        indexes = [
+            #profile pages list a profile's messages newest first, paginated on (timestamp, id)
+            models.Index(fields=['profile', '-timestamp', '-id'], name='status_profile_timestamp_idx'),
+        ]
+
     def __str__(self):
         '''Return a string representation of this StatusMessage object.'''
         return f'{self.message}'
     
     def get_images(self):
         '''Return all of the Images about this StatusMessage.'''
-        return Image.objects.filter(status_message=self)
+        # the related manager returns prefetch_related('image_set') results without a query
+        return self.image_set.all()
 
     
 class Image(models.Model):
     '''Encapsulate the idea of an image file'''
     #each Image has a ForeignKey of type Profile creating a many-to-one relationship
     status_message = models.ForeignKey("StatusMessage", on_delete=models.CASCADE)
-    image_file = models.ImageField(blank=True)
+    #stored by content hash, so identical uploads share one file (cs412/storage.py)
+    image_file = models.ImageField(blank=True, storage=content_storage)
     timestamp = models.DateTimeField(auto_now=True)
+    #set once the thumbnail/medium renditions exist (see mini_fb/thumbnails.py)
+    renditions_ready = models.BooleanField(default=False)
+
+    def get_rendition_url(self, rendition, ext):
+        '''Return the URL of one rendition ('thumb' or 'medium') of this image in format ext.'''
+        name = thumbnails.rendition_name(self.image_file.name, thumbnails.RENDITIONS[rendition], ext)
+        return thumbnails.rendition_storage.url(name)
+
+    def get_thumbnail_url(self):
+        '''Return the URL of the JPEG thumbnail, or of the original until the renditions exist.'''
+        if not self.renditions_ready:
+            return self.image_file.url
+        return self.get_rendition_url('thumb', 'jpg')
+
+    def get_srcset(self, ext):
+        '''Return a srcset attribute value listing every rendition in format ext.'''
+        return ', '.join(f'{self.get_rendition_url(rendition, ext)} {width}w'
+                         for rendition, width in thumbnails.RENDITIONS.items())
+
+    def get_webp_srcset(self):
+        '''Return the srcset of the WebP renditions.'''
+        return self.get_srcset('webp')
+
+    def get_jpeg_srcset(self):
+        '''Return the srcset of the JPEG renditions.'''
+        return self.get_srcset('jpg')
 
 class Friend(models.Model):
-    '''Encapsulate the idea of a friendship between two profiles'''
+    '''Encapsulate the idea of a friendship between two profiles.
+    Each pair is stored once, in canonical order (profile1 has the smaller id).'''
     profile1 = models.ForeignKey("Profile", on_delete=models.CASCADE, related_name="profile1")
     profile2 = models.ForeignKey("Profile", on_delete=models.CASCADE, related_name="profile2")
     timestamp = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile1', 'profile2'], name='unique_friendship'),
+            models.CheckConstraint(condition=Q(profile1__lt=F('profile2')), name='friendship_canonical_order'),
+        ]
+        indexes = [
+            #lookups by profile2 (the unique constraint already covers lookups by profile1)
+            models.Index(fields=['profile2', 'profile1'], name='friend_profile2_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        '''Store the pair in canonical order before saving.'''
+        if self.profile1_id > self.profile2_id:
+            self.profile1_id, self.profile2_id = self.profile2_id, self.profile1_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         '''Return a string representation of this Friend object.'''
         return f'{self.profile1} & {self.profile2}'
+
+
+class NewsFeedItem(models.Model):
+    '''Encapsulate the idea of one StatusMessage appearing in the news feed of one Profile.
+    Rows are written when messages are posted/deleted and when friendships are made,
+    so that reading a feed never has to look at the friends list.'''
+    #the Profile whose news feed this row belongs to
+    owner = models.ForeignKey("Profile", on_delete=models.CASCADE, related_name="feed_items")
+    status_message = models.ForeignKey("StatusMessage", on_delete=models.CASCADE, related_name="feed_items")
+    #copy of status_message.timestamp so the feed can be sorted without a join
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'status_message'], name='unique_feed_item'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-timestamp', '-status_message'], name='feed_owner_timestamp_idx'),
+        ]
+
+    def __str__(self):
+        '''Return a string representation of this NewsFeedItem object.'''
+        return f'{self.owner}: {self.status_message}'
@@ -0,0 +1,69 @@
+## mini_fb/signals.py
+# Keep the materialized news feed (NewsFeedItem) up to date as StatusMessages and Friends are written,
+# start thumbnail generation for new Images, and drop stale entries from the profile cache (mini_fb/caching.py).
+# Connected in MiniFbConfig.ready() (mini_fb/apps.py).
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from cs412.storage import file_released, release_files
+
+from .models import Profile, StatusMessage, Friend, Image
+from . import caching, feed, thumbnails
+
+@receiver(post_save, sender=StatusMessage)
+def status_message_saved(sender, instance, created, raw=False, **kwargs):
+    '''Fan a new StatusMessage out to the feeds, or refresh the timestamp of an edited one.'''
+    if raw:
+        return
+    if created:
+        feed.fan_out_status_message(instance)
+    else:
+        feed.refresh_status_message(instance)
+
+# deleting a StatusMessage removes its NewsFeedItems through on_delete=CASCADE
+
+@receiver(post_save, sender=Friend)
+def friend_saved(sender, instance, created, raw=False, **kwargs):
+    '''Merge two new friends' messages into each other's feeds.'''
+    if created and not raw:
+        feed.add_friendship(instance.profile1_id, instance.profile2_id)
+
+@receiver(post_delete, sender=Friend)
+def friend_deleted(sender, instance, **kwargs):
+    '''Remove two former friends' messages from each other's feeds.'''
+    feed.remove_friendship(instance.profile1_id, instance.profile2_id)
+
+@receiver(post_save, sender=Image)
+def image_saved(sender, instance, created, raw=False, **kwargs):
+    '''Generate the thumbnail and medium renditions of a new upload in the background.'''
+    if created and not raw and instance.image_file:
+        thumbnails.schedule_renditions(instance)
+
+# delete an Image's file once no other row shares it
+post_delete.connect(release_files, sender=Image, dispatch_uid='mini_fb_image_release_files')
+
+@receiver(file_released)
+def original_released(sender, storage, name, **kwargs):
+    '''Delete the renditions of an original file that has been deleted.'''
+    thumbnails.delete_renditions(name)
+
+@receiver([post_save, post_delete], sender=Profile)
+def profile_changed(sender, instance, **kwargs):
+    '''Forget everything cached about a Profile (its id may be reused after a rollback).'''
+    caching.invalidate([instance.pk])
+
+@receiver([post_save, post_delete], sender=Friend)
+def friendship_changed(sender, instance, **kwargs):
+    '''Forget both friends' cached friend-id sets.'''
+    caching.invalidate([instance.profile1_id, instance.profile2_id], kinds=[caching.FRIEND_IDS])
+
+@receiver([post_save, post_delete], sender=StatusMessage)
+def status_message_changed(sender, instance, **kwargs):
+    '''Forget the author's cached page of status messages.'''
+    caching.invalidate([instance.profile_id], kinds=[caching.STATUS_PAGE])
+
+@receiver([post_save, post_delete], sender=Image)
+def image_changed(sender, instance, **kwargs):
+    '''Forget the cached page of status messages that shows this Image.'''
+    profile_ids = StatusMessage.objects.filter(pk=instance.status_message_id).values_list('profile_id', flat=True)
+    caching.invalidate(list(profile_ids), kinds=[caching.STATUS_PAGE])
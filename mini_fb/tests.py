@@ -1,3 +1,689 @@
-from django.test import TestCase
+## mini_fb/tests.py
+# Tests for the mini_fb app
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models.functions import Lower
+from django.db.migrations.executor import MigrationExecutor
+from django.http import Http404, HttpResponse
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from importlib import import_module
+from io import BytesIO, StringIO
+import re
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image as PILImage
+
+from cs412.routers import PrimaryReplicaRouter, ReplicaStickinessMiddleware, STICKY_COOKIE
+from cs412.storage import content_storage, release
+from cs412.pagination import PAGE_SIZE
+from cs412.testing import QueryPlanTestMixin, TemporaryMediaMixin
+from .models import Friend, NewsFeedItem, Profile, StatusMessage, Image
+from . import caching, thumbnails, views
+
+def image_bytes(color='red', size=(320, 240), format='PNG'):
+    '''Return the bytes of a real image, filled with color.'''
+    buffer = BytesIO()
+    PILImage.new('RGB', size, color).save(buffer, format)
+    return buffer.getvalue()
+
+#settings of the test classes that upload images: renditions are made right away, and
+#the users they log in as get a fast password hash
+MEDIA_TEST_SETTINGS = {'MINI_FB_THUMBNAILS_SYNC': True,
+                       'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher']}
+
+class MediaTestCase(TemporaryMediaMixin, TestCase):
+    '''A TestCase whose uploads go to a temporary MEDIA_ROOT, deleted after the class.'''
+    media_settings = MEDIA_TEST_SETTINGS
+
+def make_profile(name):
+    '''Create and return a Profile (and its User) called name.'''
+    user = User.objects.create_user(username=name, password='password')
+    return Profile.objects.create(user=user, firstName=name, lastName='Test',
+                                  city='Boston', email=f'{name}@example.com')
+
+class ShowProfilePageQueryCountTest(MediaTestCase):
+    '''The profile page must run the same number of queries however much data the profile has.'''
+
+    def populate(self, profile, messages, images_per_message, friends):
+        '''Give profile some status messages (each with images) and some friends.'''
+        for i in range(messages):
+            sm = StatusMessage.objects.create(profile=profile, message=f'message {i}')
+            for j in range(images_per_message):
+                Image.objects.create(status_message=sm,
+                                     image_file=SimpleUploadedFile(f'{i}_{j}.png', image_bytes()))
+        for i in range(friends):
+            profile.add_friend(make_profile(f'{profile.firstName}_friend{i}'))
+
+    def count_queries(self, profile):
+        '''Return the number of queries needed to render profile's page.'''
+        self.client.force_login(profile.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('show_profile', kwargs={'pk': profile.pk}))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_data(self):
+        small = make_profile('small')
+        self.populate(small, messages=2, images_per_message=1, friends=1)
+        large = make_profile('large')
+        self.populate(large, messages=60, images_per_message=3, friends=25)
+
+        small_count = self.count_queries(small)
+        large_count = self.count_queries(large)
+        self.assertEqual(small_count, large_count)
+        self.assertLessEqual(large_count, 10)
+
+
+class ShowNewsFeedQueryCountTest(MediaTestCase):
+    '''The news feed must not run a query per item for authors or images.'''
+
+    def count_queries(self, profile):
+        '''Return the number of queries needed to render profile's news feed.'''
+        self.client.force_login(profile.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('news_feed'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_feed(self):
+        reader = make_profile('reader')
+        baseline = self.count_queries(reader)
+        for i in range(10):
+            friend = make_profile(f'author{i}')
+            reader.add_friend(friend)
+            for j in range(3):
+                sm = StatusMessage.objects.create(profile=friend, message=f'message {i}.{j}')
+                Image.objects.create(status_message=sm, image_file=SimpleUploadedFile(f'{i}_{j}.png', image_bytes()))
+        # an empty feed skips the image prefetch query
+        self.assertEqual(self.count_queries(reader), baseline + 1)
+
+
+class QueryPlanTest(QueryPlanTestMixin, MediaTestCase):
+    '''The mini_fb pages must be answered from indexes, without reading whole tables.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = make_profile('reader')
+        for i in range(5):
+            friend = make_profile(f'friend{i}')
+            cls.reader.add_friend(friend)
+            for j in range(3):
+                sm = StatusMessage.objects.create(profile=friend, message=f'message {i}.{j}')
+                Image.objects.create(status_message=sm, image_file=SimpleUploadedFile(f'{i}_{j}.png', image_bytes()))
+            friend.add_friend(make_profile(f'stranger{i}'))
+        for j in range(3):
+            StatusMessage.objects.create(profile=cls.reader, message=f'own message {j}')
+
+    def setUp(self):
+        self.client.force_login(self.reader.user)
+
+    def test_show_all_profiles(self):
+        self.assertNoFullScans(reverse('show_all'))
+        self.assertNoFullScans(reverse('show_all') + '?name=fri&city=bos')
+
+    def test_show_profile(self):
+        self.assertNoFullScans(reverse('show_profile', kwargs={'pk': self.reader.pk}))
+
+    def test_news_feed(self):
+        self.assertNoFullScans(reverse('news_feed'))
+
+    def test_friend_suggestions(self):
+        # topping up the suggestions walks mini_fb_profile in id order and stops after LIMIT rows
+        self.assertNoFullScans(reverse('friend_suggestions'), allowed=['mini_fb_profile'])
+
+
+class AsyncViewsTest(TemporaryMediaMixin, TransactionTestCase):
+    '''The async (ASGI) views must render the same pages as the sync ones.
+    A TransactionTestCase, since their queries run on other threads' connections.'''
+
+    media_settings = MEDIA_TEST_SETTINGS
+
+    def setUp(self):
+        self.reader = make_profile('reader')
+        for i in range(3):
+            friend = make_profile(f'friend{i}')
+            self.reader.add_friend(friend)
+            for j in range(2):
+                sm = StatusMessage.objects.create(profile=friend, message=f'message {i}.{j}')
+                Image.objects.create(status_message=sm, image_file=SimpleUploadedFile(f'{i}_{j}.png', image_bytes()))
+        StatusMessage.objects.create(profile=self.reader, message='own message')
+
+    def render(self, sync_view, async_view, path, **kwargs):
+        '''Return the HTML of path from sync_view and from async_view, as the reader.'''
+        request = RequestFactory().get(path)
+        request.user = self.reader.user
+        sync_response = sync_view.as_view()(request, **kwargs)
+        sync_response.render()
+
+        async def get_user():
+            return self.reader.user
+        request = AsyncRequestFactory().get(path)
+        request.user, request.auser = self.reader.user, get_user
+        async_response = async_to_sync(async_view.as_view())(request, **kwargs)
+        async_response.render()
+        # csrf tokens are masked differently on every render
+        return [re.sub(r'name="csrfmiddlewaretoken" value="\w+"', '', response.content.decode())
+                for response in (sync_response, async_response)]
+
+    def test_profile_page(self):
+        path = reverse('show_profile', kwargs={'pk': self.reader.pk})
+        sync_html, async_html = self.render(views.ShowProfilePageView, views.AsyncShowProfilePageView,
+                                            path, pk=self.reader.pk)
+        self.assertEqual(sync_html, async_html)
+        self.assertIn('friend2', async_html)
+
+    def test_news_feed(self):
+        sync_html, async_html = self.render(views.ShowNewsFeedView, views.AsyncShowNewsFeedView,
+                                            reverse('news_feed'))
+        self.assertEqual(sync_html, async_html)
+        self.assertEqual(async_html.count('<img src=\'/media/'), 6)
+
+
+@override_settings(MEDIA_RELEASE_GRACE_SECONDS=0)
+class ContentAddressedStorageTest(MediaTestCase):
+    '''Uploads are stored once per content, their renditions next to them, and both are
+    deleted when the last row using them goes.'''
+
+    def setUp(self):
+        self.message = StatusMessage.objects.create(profile=make_profile('poster'), message='pictures')
+
+    def upload(self, content, name='photo.png'):
+        '''Create an Image of content, running its on-commit work (renditions, releases).'''
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(status_message=self.message,
+                                         image_file=SimpleUploadedFile(name, content))
+        image.refresh_from_db()
+        return image
+
+    def delete(self, image):
+        '''Delete image, running its on-commit work.'''
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+
+    def rendition_names(self, name):
+        return [thumbnails.rendition_name(name, width, ext)
+                for width in thumbnails.RENDITIONS.values() for ext in thumbnails.FORMATS]
+
+    def test_renditions_are_stored_under_their_own_names(self):
+        image = self.upload(image_bytes())
+        self.assertTrue(image.image_file.name.startswith('content/'))
+        self.assertTrue(image.renditions_ready)
+        for name in self.rendition_names(image.image_file.name):
+            self.assertTrue(thumbnails.rendition_storage.exists(name), name)
+
+    def test_identical_uploads_share_a_file(self):
+        first = self.upload(image_bytes(), 'a.png')
+        second = self.upload(image_bytes(), 'b.png')
+        other = self.upload(image_bytes('blue'), 'a.png')
+        self.assertEqual(first.image_file.name, second.image_file.name)
+        self.assertNotEqual(first.image_file.name, other.image_file.name)
+
+    def test_last_release_deletes_file_and_renditions(self):
+        first = self.upload(image_bytes())
+        second = self.upload(image_bytes())
+        name = first.image_file.name
+        self.delete(first)
+        self.assertTrue(content_storage.exists(name))
+        self.delete(second)
+        self.assertFalse(content_storage.exists(name))
+        for rendition in self.rendition_names(name):
+            self.assertFalse(thumbnails.rendition_storage.exists(rendition), rendition)
+
+    def test_release_spares_a_file_reused_by_an_uncommitted_upload(self):
+        image = self.upload(image_bytes())
+        name = image.image_file.name
+        Image.objects.filter(pk=image.pk).delete()
+        # an identical upload has reused the file, but its row is not visible yet
+        with override_settings(MEDIA_RELEASE_GRACE_SECONDS=60):
+            self.assertEqual(content_storage.save('again.png', SimpleUploadedFile('again.png', image_bytes())), name)
+            self.assertFalse(release(content_storage, name))
+        self.assertTrue(content_storage.exists(name))
+        self.assertTrue(release(content_storage, name))
+        self.assertFalse(content_storage.exists(name))
+
+    def test_release_keeps_referenced_file(self):
+        image = self.upload(image_bytes())
+        self.assertFalse(release(content_storage, image.image_file.name))
+        self.assertTrue(content_storage.exists(image.image_file.name))
+
+    def test_dedupe_media(self):
+        legacy = [self.upload(image_bytes()) for i in range(2)]
+        for i, image in enumerate(legacy):
+            # stored the old way: a file of its own with renditions named after it
+            old_name = f'legacy{i}.png'
+            with open(content_storage.path(old_name), 'wb') as f:
+                f.write(image_bytes())
+            Image.objects.filter(pk=image.pk).update(image_file=old_name)
+            thumbnails.make_renditions(Image.objects.get(pk=image.pk))
+        call_command('dedupe_media', stdout=StringIO())
+        names = set(Image.objects.filter(pk__in=[image.pk for image in legacy]).values_list('image_file', flat=True))
+        self.assertEqual(names, {legacy[0].image_file.name})
+        for i in range(2):
+            self.assertFalse(content_storage.exists(f'legacy{i}.png'))
+            for rendition in self.rendition_names(f'legacy{i}.png'):
+                self.assertFalse(thumbnails.rendition_storage.exists(rendition), rendition)
+
+    def test_collect_deletes_unreferenced_files(self):
+        image = self.upload(image_bytes())
+        name = image.image_file.name
+        Image.objects.filter(pk=image.pk).delete()
+        call_command('dedupe_media', '--collect', stdout=StringIO())
+        self.assertFalse(content_storage.exists(name))
+        for rendition in self.rendition_names(name):
+            self.assertFalse(thumbnails.rendition_storage.exists(rendition), rendition)
+
+
+class RenditionsTest(MediaTestCase):
+    '''Every upload gets its renditions, and the URLs in its srcsets serve them.'''
+
+    def test_srcset_urls_serve_renditions(self):
+        message = StatusMessage.objects.create(profile=make_profile('poster'), message='pictures')
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(status_message=message,
+                                         image_file=SimpleUploadedFile('photo.png', image_bytes(size=(1000, 500))))
+        image.refresh_from_db()
+        self.assertTrue(image.renditions_ready)
+        urls = {ext: [entry.split()[0] for entry in image.get_srcset(ext).split(', ')] for ext in thumbnails.FORMATS}
+        urls['jpg'].append(image.get_thumbnail_url())
+        for ext, ext_urls in urls.items():
+            for url, width in zip(ext_urls, list(thumbnails.RENDITIONS.values()) + [thumbnails.RENDITIONS['thumb']]):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                with PILImage.open(BytesIO(b''.join(response.streaming_content))) as rendition:
+                    self.assertEqual(rendition.format, thumbnails.FORMATS[ext][0])
+                    self.assertEqual(rendition.size, (width, width // 2))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProfileCacheTest(TestCase):
+    '''The profile cache counts its hits and misses, forgets friendships as they change,
+    and is never used to write the news feed.'''
+
+    def setUp(self):
+        cache.clear()
+        caching.reset_stats()
+        self.a, self.b = make_profile('a'), make_profile('b')
+
+    def test_hit_and_miss_counters(self):
+        self.assertEqual(caching.get_profile(self.a.pk), self.a)
+        self.assertEqual(caching.get_profile(self.a.pk), self.a)
+        self.assertIsNone(caching.get_profile(0))
+        caching.get_friend_ids(self.a.pk)
+        stats = caching.stats()
+        self.assertEqual(stats[caching.PROFILE], {'hits': 1, 'misses': 2, 'hit_rate': 1 / 3})
+        self.assertEqual(stats[caching.FRIEND_IDS], {'hits': 0, 'misses': 1, 'hit_rate': 0})
+        self.assertEqual(stats[caching.STATUS_PAGE], {'hits': 0, 'misses': 0, 'hit_rate': None})
+        caching.reset_stats()
+        self.assertEqual(caching.stats()[caching.PROFILE]['hits'], 0)
+
+    def test_friendship_changes_invalidate_friend_ids(self):
+        self.assertEqual(caching.get_friend_ids(self.a.pk), set())
+        self.assertEqual(caching.get_friend_ids(self.b.pk), set())
+        self.a.add_friend(self.b)
+        self.assertEqual(caching.get_friend_ids(self.a.pk), {self.b.pk})
+        self.assertEqual(caching.get_friend_ids(self.b.pk), {self.a.pk})
+        Friend.objects.get().delete()
+        self.assertEqual(caching.get_friend_ids(self.a.pk), set())
+        self.assertEqual(caching.get_friend_ids(self.b.pk), set())
+
+    def test_fan_out_ignores_stale_cache(self):
+        self.a.add_friend(self.b)
+        # another process's cache that has not seen the friendship yet
+        cache.set(caching.make_key(caching.FRIEND_IDS, self.b.pk), frozenset())
+        message = StatusMessage.objects.create(profile=self.b, message='hello')
+        self.assertTrue(NewsFeedItem.objects.filter(owner=self.a, status_message=message).exists())
+        self.assertEqual(self.b.get_friend_ids(), {self.a.pk})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class FriendTest(TestCase):
+    '''Each friendship is one row, with the smaller profile id in profile1.'''
+
+    def setUp(self):
+        self.a, self.b = make_profile('a'), make_profile('b')
+
+    def test_add_friend_once(self):
+        self.assertTrue(self.a.add_friend(self.b))
+        self.assertFalse(self.a.add_friend(self.b))
+        self.assertFalse(self.b.add_friend(self.a))
+        self.assertFalse(self.a.add_friend(self.a))
+        self.assertEqual(Friend.objects.count(), 1)
+        self.assertEqual(self.a.get_friend_ids(), {self.b.pk})
+        self.assertEqual(self.b.get_friend_ids(), {self.a.pk})
+
+    def test_save_swaps_into_order(self):
+        friend = Friend.objects.create(profile1=self.b, profile2=self.a)
+        friend.refresh_from_db()
+        self.assertEqual((friend.profile1_id, friend.profile2_id), (self.a.pk, self.b.pk))
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class FriendSuggestionsTest(TestCase):
+    '''Suggestions rank friends-of-friends by mutual friends, then fill up with other profiles.'''
+
+    def setUp(self):
+        cache.clear()
+        self.me = make_profile('me')
+        friends = [make_profile(f'friend{i}') for i in range(3)]
+        for friend in friends:
+            self.me.add_friend(friend)
+        friends[0].add_friend(friends[1])
+        self.three, self.two, self.one = make_profile('three'), make_profile('two'), make_profile('one')
+        for friend in friends:
+            friend.add_friend(self.three)
+        for friend in friends[:2]:
+            friend.add_friend(self.two)
+        friends[2].add_friend(self.one)
+        self.strangers = [make_profile(f'stranger{i}') for i in range(3)]
+
+    def suggestions(self, limit):
+        return [(profile.firstName, profile.mutual_friends) for profile in self.me.get_friend_suggestions(limit=limit)]
+
+    def test_ranking_and_fill_up(self):
+        self.assertEqual(self.suggestions(10), [('three', 3), ('two', 2), ('one', 1),
+                                                ('stranger0', 0), ('stranger1', 0), ('stranger2', 0)])
+        self.assertEqual(self.suggestions(4), [('three', 3), ('two', 2), ('one', 1), ('stranger0', 0)])
+        self.assertEqual(self.suggestions(2), [('three', 3), ('two', 2)])
+
+    def test_limit_is_clamped(self):
+        self.client.force_login(self.me.user)
+        url = reverse('friend_suggestions')
+        with mock.patch.object(views.ShowFriendSuggestionsView, 'MAX_SUGGESTIONS', 4):
+            for limit, expected in [('0', 1), ('-5', 1), ('2', 2), ('1000', 4), ('many', 6)]:
+                response = self.client.get(url, {'limit': limit})
+                self.assertEqual(len(response.context['suggestions']), expected, limit)
+
+class CanonicalFriendshipMigrationTest(TransactionTestCase):
+    '''Migration 0013 rewrites reversed friendships and deletes duplicate and self pairs.'''
+
+    migrate_from = [('mini_fb', '0012_statusmessage_profile_timestamp_idx')]
+    migrate_to = [('mini_fb', '0013_canonical_friendship')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.leaf_nodes = executor.loader.graph.leaf_nodes()
+        executor.migrate(self.migrate_from)
+        self.old_apps = executor.loader.project_state(self.migrate_from).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.leaf_nodes)
+
+    def test_friendships_become_canonical(self):
+        User = self.old_apps.get_model('auth', 'User')
+        Profile = self.old_apps.get_model('mini_fb', 'Profile')
+        Friend = self.old_apps.get_model('mini_fb', 'Friend')
+        a, b, c, d = [Profile.objects.create(user=User.objects.create(username=name), firstName=name,
+                                             lastName='Test', city='Boston', email=f'{name}@example.com')
+                      for name in 'abcd']
+        kept = [Friend.objects.create(profile1=b, profile2=a),   # reversed
+                Friend.objects.create(profile1=a, profile2=c),   # already canonical
+                Friend.objects.create(profile1=d, profile2=c)]   # reversed
+        Friend.objects.create(profile1=a, profile2=b)            # duplicate of the first, in order
+        Friend.objects.create(profile1=c, profile2=a)            # duplicate of the second, reversed
+        Friend.objects.create(profile1=d, profile2=d)            # self
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        Friend = executor.loader.project_state(self.migrate_to).apps.get_model('mini_fb', 'Friend')
+        self.assertEqual(sorted(Friend.objects.values_list('id', 'profile1_id', 'profile2_id')),
+                         [(kept[0].id, a.id, b.id), (kept[1].id, a.id, c.id), (kept[2].id, c.id, d.id)])
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class NewsFeedTest(TestCase):
+    '''The materialized feed follows new and deleted messages and friendships,
+    and the feed commands fill in and repair what it missed.'''
+
+    def setUp(self):
+        self.a, self.b, self.c = make_profile('a'), make_profile('b'), make_profile('c')
+        self.a.add_friend(self.b)
+
+    def feed(self, profile):
+        return set(NewsFeedItem.objects.filter(owner=profile).values_list('status_message__message', flat=True))
+
+    def test_posting_fans_out_once(self):
+        self.client.force_login(self.b.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('create_status'), {'message': 'second breakfast'})
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len([sql for sql in writes if 'mini_fb_newsfeeditem' in sql]), 1, writes)
+        self.assertEqual(len([sql for sql in writes if 'mini_fb_statusmessage' in sql]), 1, writes)
+        self.assertRedirects(response, reverse('show_profile', kwargs={'pk': self.b.pk}))
+        self.assertEqual(StatusMessage.objects.filter(message='second breakfast').count(), 1)
+        self.assertEqual(self.feed(self.a), {'second breakfast'})
+        self.assertEqual(self.feed(self.b), {'second breakfast'})
+        self.assertEqual(self.feed(self.c), set())
+
+    def test_deleting_a_message_removes_it_from_feeds(self):
+        message = StatusMessage.objects.create(profile=self.b, message='gone')
+        StatusMessage.objects.create(profile=self.b, message='kept')
+        message.delete()
+        self.assertEqual(self.feed(self.a), {'kept'})
+        self.assertEqual(self.feed(self.b), {'kept'})
+
+    def test_friendships_merge_and_split_feeds(self):
+        StatusMessage.objects.create(profile=self.a, message='from a')
+        StatusMessage.objects.create(profile=self.c, message='from c')
+        self.a.add_friend(self.c)
+        self.assertEqual(self.feed(self.a), {'from a', 'from c'})
+        self.assertEqual(self.feed(self.c), {'from a', 'from c'})
+        Friend.objects.filter(profile1__in=[self.a, self.c], profile2__in=[self.a, self.c]).delete()
+        self.assertEqual(self.feed(self.a), {'from a'})
+        self.assertEqual(self.feed(self.c), {'from c'})
+        self.assertEqual(self.feed(self.b), {'from a'})
+
+    def test_migration_fills_existing_feeds(self):
+        backfill_feeds = import_module('mini_fb.migrations.0011_newsfeeditem').backfill_feeds
+        StatusMessage.objects.create(profile=self.a, message='from a')
+        StatusMessage.objects.create(profile=self.b, message='from b')
+        StatusMessage.objects.create(profile=self.c, message='from c')
+        NewsFeedItem.objects.all().delete()
+        backfill_feeds(apps, None)
+        self.assertEqual(self.feed(self.a), {'from a', 'from b'})
+        self.assertEqual(self.feed(self.b), {'from a', 'from b'})
+        self.assertEqual(self.feed(self.c), {'from c'})
+
+    def test_backfill_news_feed(self):
+        StatusMessage.objects.create(profile=self.a, message='from a')
+        StatusMessage.objects.create(profile=self.b, message='from b')
+        NewsFeedItem.objects.filter(owner=self.a).delete()
+        out = StringIO()
+        call_command('backfill_news_feed', stdout=out)
+        self.assertIn('Backfilled 2 news feed items.', out.getvalue())
+        self.assertEqual(self.feed(self.a), {'from a', 'from b'})
+        call_command('backfill_news_feed', stdout=out)
+        self.assertIn('Backfilled 0 news feed items.', out.getvalue())
+
+    def test_rebuild_news_feed(self):
+        message = StatusMessage.objects.create(profile=self.b, message='from b')
+        StatusMessage.objects.create(profile=self.c, message='from c')
+        NewsFeedItem.objects.filter(owner=self.a).delete()
+        NewsFeedItem.objects.create(owner=self.b, status_message=StatusMessage.objects.get(message='from c'),
+                                    timestamp=message.timestamp)
+        with self.assertRaisesMessage(CommandError, '2 news feeds are inconsistent.'):
+            call_command('rebuild_news_feed', '--check', stdout=StringIO())
+        self.assertEqual(self.feed(self.a), set())
+
+        out = StringIO()
+        call_command('rebuild_news_feed', stdout=out)
+        self.assertIn('Repaired news feeds; 2 needed changes.', out.getvalue())
+        self.assertEqual(self.feed(self.a), {'from b'})
+        self.assertEqual(self.feed(self.b), {'from b'})
+        call_command('rebuild_news_feed', '--check', stdout=out)
+        self.assertIn('Checked news feeds; 0 needed changes.', out.getvalue())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StatusPaginationTest(TestCase):
+    '''The profile page and news feed page through every message once by ?before= cursor,
+    and answer a malformed cursor with 400.'''
+
+    def setUp(self):
+        cache.clear()
+        self.reader, self.author = make_profile('reader'), make_profile('author')
+        self.reader.add_friend(self.author)
+        for i in range(PAGE_SIZE * 2 + 3):
+            StatusMessage.objects.create(profile=self.author, message=f'message {i}')
+        # several messages posted within the same microsecond
+        first = StatusMessage.objects.order_by('id').first()
+        tied = StatusMessage.objects.filter(id__lt=first.id + 10)
+        tied.update(timestamp=first.timestamp)
+        NewsFeedItem.objects.filter(status_message__in=tied).update(timestamp=first.timestamp)
+        self.client.force_login(self.reader.user)
+
+    def walk(self, first_url, older_url, context_name):
+        '''Return the message ids shown by first_url and then by older_url until there is no next cursor.'''
+        response = self.client.get(first_url)
+        ids = [message.id for message in response.context[context_name]]
+        while response.context['next_cursor']:
+            self.assertLessEqual(len(response.context[context_name]), PAGE_SIZE)
+            response = self.client.get(older_url, {'before': response.context['next_cursor']})
+            ids += [message.id for message in response.context[context_name]]
+        return ids
+
+    def test_profile_pages(self):
+        ids = self.walk(reverse('show_profile', kwargs={'pk': self.author.pk}),
+                        reverse('older_status_messages', kwargs={'pk': self.author.pk}), 'status_messages')
+        self.assertEqual(ids, list(StatusMessage.objects.order_by('-timestamp', '-id').values_list('id', flat=True)))
+
+    def test_news_feed_pages(self):
+        ids = self.walk(reverse('news_feed'), reverse('older_news_feed'), 'news_feed')
+        self.assertEqual(ids, list(StatusMessage.objects.order_by('-timestamp', '-id').values_list('id', flat=True)))
+
+    def test_malformed_cursors(self):
+        urls = [reverse('show_profile', kwargs={'pk': self.author.pk}),
+                reverse('older_status_messages', kwargs={'pk': self.author.pk}),
+                reverse('news_feed'), reverse('older_news_feed')]
+        for url in urls:
+            for cursor in ['x', '12', '1-x', '9' * 30 + '-1']:
+                self.assertEqual(self.client.get(url, {'before': cursor}).status_code, 400, (url, cursor))
+
+
+class ProfileDirectoryTest(TestCase):
+    '''The profile directory pages through every matching profile once, sorted by last name,
+    and searches by first/last name and city prefix.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='owner')
+        people = [('Frodo', 'Baggins', 'Hobbiton'), ('Bilbo', 'Baggins', 'Hobbiton'), ('Samwise', 'Gamgee', 'Hobbiton'),
+                  ('Meriadoc', 'Brandybuck', 'Buckland'), ('Peregrin', 'Took', 'Tuckborough'),
+                  ('Fredegar', 'Bolger', 'Budgeford')]
+        people += [(f'Extra{i}', 'Baggins' if i % 2 else 'Proudfoot', 'Bree') for i in range(PAGE_SIZE + 2)]
+        Profile.objects.bulk_create([Profile(user=user, firstName=first, lastName=last, city=city,
+                                             email=f'{first}@example.com') for first, last, city in people])
+
+    def walk(self, **params):
+        '''Return the first names of every profile listed, following the next page links.'''
+        response = self.client.get(reverse('show_all'), params)
+        names = [profile.firstName for profile in response.context['profiles']]
+        while response.context['next_page']:
+            response = self.client.get(reverse('show_all') + response.context['next_page'])
+            names += [profile.firstName for profile in response.context['profiles']]
+        return names
+
+    def test_pages_cover_every_profile_once(self):
+        expected = list(Profile.objects.order_by(Lower('lastName'), 'id').values_list('firstName', flat=True))
+        self.assertGreater(len(expected), PAGE_SIZE)
+        self.assertEqual(self.walk(), expected)
+
+    def test_prefix_search(self):
+        self.assertEqual(self.walk(name='fr'), ['Frodo', 'Fredegar'])
+        self.assertEqual(self.walk(name='BAGG')[:2], ['Frodo', 'Bilbo'])
+        self.assertEqual(len(self.walk(name='bagg')), Profile.objects.filter(lastName='Baggins').count())
+        self.assertEqual(self.walk(name='b', city='hob'), ['Frodo', 'Bilbo'])
+        self.assertEqual(self.walk(city='Bu'), ['Fredegar', 'Meriadoc'])
+        self.assertEqual(self.walk(name='extra', city='bree'),
+                         list(Profile.objects.filter(city='Bree').order_by(Lower('lastName'), 'id')
+                                             .values_list('firstName', flat=True)))
+        self.assertEqual(self.walk(name='gollum'), [])
+        # the search terms are kept in the next page link
+        response = self.client.get(reverse('show_all'), {'name': 'extra'})
+        self.assertIn('name=extra', response.context['next_page'])
+
+    def test_malformed_after(self):
+        missing = Profile.objects.order_by('-id').first().pk + 1
+        for after in ['x', '1.5', '-1x', str(missing)]:
+            self.assertEqual(self.client.get(reverse('show_all'), {'after': after}).status_code, 400, after)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CurrentProfileTest(TestCase):
+    '''The pages of the logged-in user's own Profile find it once per request, and are
+    a 404 for a user without one.'''
+
+    def test_user_without_profile(self):
+        user = User.objects.create_user(username='blogger', password='password')
+        self.client.force_login(user)
+        for name in ['news_feed', 'friend_suggestions', 'create_status', 'update_profile']:
+            self.assertEqual(self.client.get(reverse(name)).status_code, 404, name)
+
+        async def get_user():
+            return user
+        request = AsyncRequestFactory().get(reverse('news_feed'))
+        request.user, request.auser = user, get_user
+        with self.assertRaises(Http404):
+            async_to_sync(views.AsyncShowNewsFeedView.as_view())(request)
+
+    def test_sessions_of_the_previous_backend(self):
+        profile = make_profile('reader')
+        # logged in before ProfileBackend was added: the session stores ModelBackend's path
+        self.client.force_login(profile.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('news_feed'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['profile'], profile)
+
+    def test_login_uses_profile_backend(self):
+        profile = make_profile('reader')
+        self.assertTrue(self.client.login(username='reader', password='password'))
+        self.assertEqual(self.client.session['_auth_user_backend'], 'mini_fb.backends.ProfileBackend')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('news_feed'))
+            context_profile = response.context['profile']
+        self.assertEqual(context_profile, profile)
+        self.assertEqual(len([q for q in queries.captured_queries if 'FROM "mini_fb_profile"' in q['sql']]), 1)
+
+
+@override_settings(REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTest(SimpleTestCase):
+    '''Reads go to the replica, except for writing requests and for a while after a write.'''
+
+    def route(self, request, write=False):
+        '''Run request through the middleware; return (database used for reads, response).'''
+        router = PrimaryReplicaRouter()
+        seen = {}
+
+        def view(request):
+            seen['read'] = router.db_for_read(Profile)
+            if write:
+                router.db_for_write(Profile)
+            return HttpResponse()
+
+        response = ReplicaStickinessMiddleware(view)(request)
+        return seen['read'], response
+
+    def test_reads_use_replica(self):
+        db, response = self.route(RequestFactory().get('/'))
+        self.assertEqual(db, 'replica')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_write_requests_use_primary_and_stick(self):
+        db, response = self.route(RequestFactory().post('/'), write=True)
+        self.assertEqual(db, 'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        request = RequestFactory().get('/')
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        self.assertEqual(self.route(request)[0], 'default')
+
+    def test_expired_stickiness(self):
+        request = RequestFactory().get('/')
+        request.COOKIES[STICKY_COOKIE] = '0'
+        self.assertEqual(self.route(request)[0], 'replica')
@@ -0,0 +1,114 @@
+## mini_fb/thumbnails.py
+# Derivative images (renditions) for uploaded status message Images.
+# Every upload gets a fixed-width thumbnail and medium version in WebP and JPEG,
+# generated by Pillow on a small thread pool so the upload request does not wait for it.
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image as PILImage, ImageOps
+
+from cs412.routers import use_primary
+
+from . import caching
+
+logger = logging.getLogger(__name__)
+
+#rendition name -> width in pixels
+RENDITIONS = {
+    'thumb': 200,
+    'medium': 800,
+}
+
+#file extension -> (Pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+#directory (inside MEDIA_ROOT) the renditions are stored in
+RENDITION_DIR = 'renditions'
+#the renditions' storage: they are named after their original, so they must not be
+#renamed by content hash like the originals in cs412.storage.content_storage
+rendition_storage = default_storage
+
+_executor = None
+
+def get_executor():
+    '''Return the thread pool that renditions are generated on, creating it on first use.'''
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'MINI_FB_THUMBNAIL_WORKERS', 2)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mini_fb-thumbnails')
+    return _executor
+
+def rendition_name(name, width, ext):
+    '''Return the storage name of the width-pixel-wide, ext-format rendition of the file called name.'''
+    stem = os.path.splitext(name)[0]
+    return f'{RENDITION_DIR}/{stem}_{width}.{ext}'
+
+def make_renditions(image):
+    '''Create every rendition of image (an mini_fb Image) in rendition_storage and mark it ready.'''
+    field = image.image_file
+    storage = rendition_storage
+    with field.open('rb') as f:
+        original = PILImage.open(f)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    for width in RENDITIONS.values():
+        # never scale an image up
+        size = (min(width, original.width), max(1, round(original.height * min(width, original.width) / original.width)))
+        resized = original.resize(size, PILImage.LANCZOS)
+        for ext, (pil_format, options) in FORMATS.items():
+            out = resized
+            if pil_format == 'JPEG' and out.mode != 'RGB':
+                out = out.convert('RGB')
+            buffer = BytesIO()
+            out.save(buffer, pil_format, **options)
+            name = rendition_name(field.name, width, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+    type(image).objects.filter(pk=image.pk).update(renditions_ready=True)
+    image.renditions_ready = True
+    # the cached status message page still has this Image without its renditions
+    caching.invalidate([image.status_message.profile_id], kinds=[caching.STATUS_PAGE])
+
+def delete_renditions(name):
+    '''Delete every rendition of the file called name.'''
+    for width in RENDITIONS.values():
+        for ext in FORMATS:
+            rendition_storage.delete(rendition_name(name, width, ext))
+
+def _generate(image_id):
+    '''Make the renditions for the Image with this id, logging (not raising) any failure.'''
+    from .models import Image
+    try:
+        # the Image was committed just now, so it may not have reached a read replica yet
+        with use_primary():
+            image = Image.objects.filter(pk=image_id).first()
+        if image is not None and image.image_file:
+            make_renditions(image)
+    except Exception:
+        logger.exception('Could not make renditions for Image %s', image_id)
+
+def _generate_in_background(image_id):
+    '''Worker-thread entry point: _generate() on the thread's own database connection.'''
+    close_old_connections()
+    try:
+        _generate(image_id)
+    finally:
+        close_old_connections()
+
+def schedule_renditions(image):
+    '''Generate image's renditions once the current transaction commits: in the background,
+    or in this thread if settings.MINI_FB_THUMBNAILS_SYNC.'''
+    if getattr(settings, 'MINI_FB_THUMBNAILS_SYNC', False):
+        transaction.on_commit(lambda: _generate(image.pk))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_generate_in_background, image.pk))
@@ -3,10 +3,21 @@
 from django.urls import path
 from . import views
 from django.contrib.auth import views as auth_views    ## Authentication Package
+from django.conf import settings
+
+# under ASGI (cs412/asgi.py) the profile page and news feed use their async versions
+if settings.MINI_FB_ASYNC_VIEWS:
+    profile_views = (views.AsyncShowProfilePageView, views.AsyncShowOlderStatusMessagesView)
+    feed_views = (views.AsyncShowNewsFeedView, views.AsyncShowOlderNewsFeedView)
+else:
+    profile_views = (views.ShowProfilePageView, views.ShowOlderStatusMessagesView)
+    feed_views = (views.ShowNewsFeedView, views.ShowOlderNewsFeedView)
+
 urlpatterns = [
     # map the URL (empty string) to the view
     path('', views.ShowAllProfilesView.as_view(), name='show_all'), # generic class-based view
-    path('profile/<int:pk>/', views.ShowProfilePageView.as_view(), name='show_profile'),
+    path('profile/<int:pk>/', profile_views[0].as_view(), name='show_profile'),
+    path('profile/<int:pk>/status_messages', profile_views[1].as_view(), name='older_status_messages'),
     path('createProfile', views.CreateProfileView.as_view(), name='createProfile'),
     # path('profile/<int:pk>/create_status', views.CreateStatusMessageView.as_view(), name='create_status'),
     # path('profile/<int:pk>/update', views.UpdateProfileView.as_view(), name="update_profile"),
@@ -20,7 +31,9 @@ urlpatterns = [
     # path('profile/<int:pk>/news_feed/', views.ShowNewsFeedView.as_view(), name='news_feed'),
     path('profile/add_friend/<int:other_pk>', views.CreateFriendView.as_view(), name='create_friend'),
     path('profile/friend_suggestions/', views.ShowFriendSuggestionsView.as_view(), name='friend_suggestions'),
-    path('profile/news_feed/', views.ShowNewsFeedView.as_view(), name='news_feed'),
+    path('profile/news_feed/', feed_views[0].as_view(), name='news_feed'),
+    path('profile/news_feed/older', feed_views[1].as_view(), name='older_news_feed'),
+    path('cache_stats', views.CacheStatsView.as_view(), name='cache_stats'),
     #Authentication URLs
     path('login/', auth_views.LoginView.as_view(template_name='mini_fb/login.html'), name='FBlogin'),
     path('logout/', auth_views.LogoutView.as_view(next_page='show_all'), name='FBlogout'),
@@ -5,24 +5,72 @@
 import profile
 
 from django.forms import BaseModelForm
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseRedirect, Http404, JsonResponse
 from .models import *
 from django.views.generic import ListView, DetailView, View
 from django.views.generic.edit import CreateView
 from .forms import *
+from cs412.pagination import keyset_page, sorted_page
+from django.db.models.functions import Lower
+from urllib.parse import urlencode
+from .middleware import get_profile
+from . import caching
 from django.urls import reverse
+from django.conf import settings
 from typing import Any
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
 
+class CurrentProfileMixin:
+    '''Use the logged-in user's Profile (request.profile, see mini_fb/middleware.py) as the view's object.'''
+
+    def get_object(self, queryset=None):
+        '''Return the logged-in user's Profile; it is only looked up once per request.
+        Raise Http404 for a user without a Profile (as the async views do).'''
+        profile = get_profile(self.request)
+        if profile is None:
+            raise Http404('No Profile for this user.')
+        return profile
+
 #class-based view
 class ShowAllProfilesView(ListView):
-    '''Create a subclass of ListView to display all mini_fb articles.'''
+    '''Create a subclass of ListView to display one page of mini_fb profiles,
+    sorted by last name and optionally searched by ?name= and ?city= prefixes.'''
     model = Profile # retrieve objects of type Article from the database
     template_name = 'mini_fb/show_all_profiles.html'
     context_object_name = 'profiles' # how to find the data in the template file (context variable)
 
+    def get_queryset(self):
+        '''Return one page of matching profiles, starting after the ?after= profile id.'''
+        self.name = self.request.GET.get('name', '').strip()
+        self.city = self.request.GET.get('city', '').strip()
+        profiles = Profile.search(name=self.name, city=self.city)
+        page, self.next_after = sorted_page(profiles, Lower('lastName'), self.request.GET.get('after'))
+        return page
+
+    def get_context_data(self, **kwargs):
+        '''Add the search terms and the link to the next page.'''
+        context = super().get_context_data(**kwargs)
+        context['name'] = self.name
+        context['city'] = self.city
+        if self.next_after:
+            context['next_page'] = '?' + urlencode({'name': self.name, 'city': self.city, 'after': self.next_after})
+        else:
+            context['next_page'] = None
+        return context
+
+def status_message_page(profile_id, before=None):
+    '''Return (messages, next_cursor) for one page of a profile's status messages,
+    starting after the before cursor; the first page comes from the cache.'''
+    # images for the whole page come from one prefetch query instead of one query per message
+    load_page = lambda: keyset_page(StatusMessage.objects.filter(profile_id=profile_id)
+                                                         .prefetch_related('image_set'), before)
+    if before:
+        return load_page()
+    # the first page is what almost every visit shows, so it is cached
+    return caching.get_status_page(profile_id, load_page)
+
 #A more detailed version for a single profile
 class ShowProfilePageView(DetailView):
     '''Create a class that inheirits DetailView to display a single profile'''
@@ -30,6 +78,25 @@ class ShowProfilePageView(DetailView):
     template_name = 'mini_fb/show_profile.html'
     context_object_name = 'profile'
 
+    def get_object(self, queryset=None):
+        '''Return the Profile from the read-through cache (mini_fb/caching.py).'''
+        profile = caching.get_profile(self.kwargs['pk'])
+        if profile is None:
+            raise Http404('No Profile matches the given query.')
+        return profile
+
+    def get_context_data(self, **kwargs):
+        '''Add one page of this profile's status messages, starting after the ?before= cursor.'''
+        context = super().get_context_data(**kwargs)
+        messages, next_cursor = status_message_page(self.object.pk, self.request.GET.get('before'))
+        context['status_messages'] = messages
+        context['next_cursor'] = next_cursor
+        return context
+
+class ShowOlderStatusMessagesView(ShowProfilePageView):
+    '''Return just the next page of a profile's status messages (the "load older" endpoint).'''
+    template_name = 'mini_fb/status_messages.html'
+
 #The view to create a new profile
 class CreateProfileView(CreateView):
     '''A view to create a new profile and save it to the database.'''
@@ -64,7 +131,7 @@ class CreateProfileView(CreateView):
         return self.form_invalid(form)
 
 #The view to create a new StatusMessage
-class CreateStatusMessageView(LoginRequiredMixin, CreateView):
+class CreateStatusMessageView(LoginRequiredMixin, CurrentProfileMixin, CreateView):
     '''A view to create a new StatusMessage and save it to the database.'''
     form_class = CreateStatusMessageForm
     template_name = "mini_fb/create_status_form.html"
@@ -109,21 +176,17 @@ class CreateStatusMessageView(LoginRequiredMixin, CreateView):
             image.save()
 
 
-        #Delegate work to super
-        return super().form_valid(form)
+        # redirect without super().form_valid(form), which would save (and fan out) the message again
+        self.object = sm
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self) -> str:
         '''Return the URL to redirect to after successfully submitting form.'''
         profile = self.get_object()
         return reverse('show_profile', kwargs={'pk': profile.pk})
-    
-    def get_object(self):
-        # Fetch the first Profile associated with the user
-        profile = Profile.objects.filter(user=self.request.user).first()
-        return profile
 
 from django.views.generic.edit import UpdateView
-class UpdateProfileView(LoginRequiredMixin, UpdateView):
+class UpdateProfileView(LoginRequiredMixin, CurrentProfileMixin, UpdateView):
     '''A view to update an Article and save it to the database.'''
     form_class = UpdateProfileForm
     template_name = "mini_fb/update_profile_form.html"
@@ -144,11 +207,6 @@ class UpdateProfileView(LoginRequiredMixin, UpdateView):
         '''Return the URL to redirect to after successfully submitting form.'''
         profile = self.get_object()
         return reverse('show_profile', kwargs={'pk': profile.pk})
-    
-    def get_object(self):
-        # Fetch the first Profile associated with the user
-        profile = Profile.objects.filter(user=self.request.user).first()
-        return profile
 
 class UpdateStatusMessageView(LoginRequiredMixin, UpdateView):
     '''A view to update an StatusMessage and save it to the database.'''
@@ -203,7 +261,7 @@ class DeleteStatusMessageView(LoginRequiredMixin, DeleteView):
         return reverse('show_profile', kwargs={'pk':message.pk})
 
 from django.shortcuts import redirect
-class CreateFriendView(LoginRequiredMixin, View):
+class CreateFriendView(LoginRequiredMixin, CurrentProfileMixin, View):
     '''A view to create a new friend for a user.'''
 
     def get_login_url(self) -> str:
@@ -222,17 +280,14 @@ class CreateFriendView(LoginRequiredMixin, View):
 
         # Redirect back to the profile page
         return redirect(reverse('show_profile', kwargs={'pk': profile.pk}))
-    
-    def get_object(self):
-        # Fetch the first Profile associated with the user
-        profile = Profile.objects.filter(user=self.request.user).first()
-        return profile
 
-class ShowFriendSuggestionsView(LoginRequiredMixin, DetailView):
+class ShowFriendSuggestionsView(LoginRequiredMixin, CurrentProfileMixin, DetailView):
     '''Show suggestions for a given profile'''
     model = Profile
     template_name = 'mini_fb/friend_suggestions.html'
     context_object_name = 'profile'
+    #largest ?limit= accepted
+    MAX_SUGGESTIONS = 100
 
     def get_login_url(self) -> str:
         '''Return the URL to the login page.'''
@@ -240,16 +295,16 @@ class ShowFriendSuggestionsView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Get friend suggestions for the current profile
-        context['suggestions'] = self.object.get_friend_suggestions()
+        # Get friend suggestions for the current profile; ?limit= picks how many (1 to MAX_SUGGESTIONS)
+        limit = self.request.GET.get('limit', SUGGESTION_LIMIT)
+        try:
+            limit = min(max(int(limit), 1), self.MAX_SUGGESTIONS)
+        except ValueError:
+            limit = SUGGESTION_LIMIT
+        context['suggestions'] = self.object.get_friend_suggestions(limit=limit)
         return context
-    
-    def get_object(self):
-        # Fetch the first Profile associated with the user
-        profile = Profile.objects.filter(user=self.request.user).first()
-        return profile
 
-class ShowNewsFeedView(LoginRequiredMixin, DetailView):
+class ShowNewsFeedView(LoginRequiredMixin, CurrentProfileMixin, DetailView):
     '''Show news feed for a given profile'''
     model = Profile
     template_name = 'mini_fb/news_feed.html'
@@ -261,11 +316,117 @@ class ShowNewsFeedView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Get the news feed for the current profile
-        context['news_feed'] = self.object.get_news_feed()
+        # Get one page of the news feed for the current profile, starting after the ?before= cursor
+        # authors and images for the whole page are loaded in bulk rather than once per item
+        items = (self.object.get_news_feed_items()
+                            .select_related('status_message__profile')
+                            .prefetch_related('status_message__image_set'))
+        items, next_cursor = keyset_page(items, self.request.GET.get('before'),
+                                         timestamp_field='timestamp', id_field='status_message_id')
+        context['news_feed'] = [item.status_message for item in items]
+        context['next_cursor'] = next_cursor
         return context
-    
-    def get_object(self):
-        # Fetch the first Profile associated with the user
-        profile = Profile.objects.filter(user=self.request.user).first()
-        return profile
\ No newline at end of file
+
+class ShowOlderNewsFeedView(ShowNewsFeedView):
+    '''Return just the next page of the news feed (the "load older" endpoint).'''
+    template_name = 'mini_fb/news_feed_items.html'
+
+from django.contrib.auth.mixins import UserPassesTestMixin
+class CacheStatsView(UserPassesTestMixin, View):
+    '''Report the hit rates of the profile cache (mini_fb/caching.py) in this server process, as JSON.'''
+
+    def test_func(self):
+        '''Only staff may see the cache statistics.'''
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        '''Return the hits, misses and hit rate of each kind of cache entry.'''
+        return JsonResponse({'cache': settings.CACHES['default']['BACKEND'], 'stats': caching.stats()})
+
+## Async versions of the profile page and news feed, used when serving under ASGI (cs412/asgi.py)
+import asyncio
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from cs412.pagination import keyset_filter, split_page, PAGE_SIZE
+
+async def run_query(function, *args):
+    '''Run a synchronous ORM call in a worker thread with its own database connection,
+    so that several independent queries can run at the same time.'''
+    def call():
+        try:
+            return function(*args)
+        finally:
+            # the worker thread outlives the request, so release its connection like a request would
+            close_old_connections()
+    return await sync_to_async(call, thread_sensitive=False)()
+
+def attach_images(messages, images):
+    '''Store images on their StatusMessages as if they had been loaded with prefetch_related('image_set').'''
+    by_message = defaultdict(list)
+    for image in sorted(images, key=lambda image: image.pk):
+        by_message[image.status_message_id].append(image)
+    cache_name = Image._meta.get_field('status_message').remote_field.cache_name
+    for message in messages:
+        images = message.image_set.all()
+        images._result_cache = by_message[message.pk]
+        images._prefetch_done = True
+        message._prefetched_objects_cache = {cache_name: images}
+
+class AsyncShowProfilePageView(ShowProfilePageView):
+    '''ShowProfilePageView for ASGI: the profile, its page of status messages and its
+    friends are independent, so they are loaded concurrently.'''
+
+    async def get(self, request, *args, **kwargs):
+        '''Load the page's data concurrently and render it.'''
+        profile_id = self.kwargs['pk']
+        profile, (messages, next_cursor), friends = await asyncio.gather(
+            run_query(caching.get_profile, profile_id),
+            run_query(status_message_page, profile_id, request.GET.get('before')),
+            run_query(caching.get_friend_profiles, profile_id))
+        if profile is None:
+            raise Http404('No Profile matches the given query.')
+        profile._friends_cache = friends
+        self.object = profile
+        context = {'view': self, 'object': profile, 'profile': profile,
+                   'status_messages': messages, 'next_cursor': next_cursor}
+        return self.render_to_response(context)
+
+class AsyncShowOlderStatusMessagesView(AsyncShowProfilePageView):
+    '''ShowOlderStatusMessagesView for ASGI.'''
+    template_name = 'mini_fb/status_messages.html'
+
+class AsyncShowNewsFeedView(ShowNewsFeedView):
+    '''ShowNewsFeedView for ASGI: the page of feed items and the images of those items
+    are loaded concurrently (the images with a subquery over the same page).'''
+
+    def dispatch(self, request, *args, **kwargs):
+        '''Skip LoginRequiredMixin's synchronous check; get() checks the login with request.auser().'''
+        return View.dispatch(self, request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        '''Load the page's data concurrently and render it.'''
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), self.get_login_url())
+        profile = await sync_to_async(get_profile)(request)
+        if profile is None:
+            raise Http404('No Profile for this user.')
+        page = keyset_filter(profile.get_news_feed_items(), request.GET.get('before'),
+                             timestamp_field='timestamp', id_field='status_message_id')
+        items, images = await asyncio.gather(
+            run_query(lambda: list(page.select_related('status_message__profile')[:PAGE_SIZE + 1])),
+            run_query(lambda: list(Image.objects.filter(
+                status_message__in=page.values('status_message_id')[:PAGE_SIZE]))))
+        items, next_cursor = split_page(items, timestamp_field='timestamp', id_field='status_message_id')
+        news_feed = [item.status_message for item in items]
+        attach_images(news_feed, images)
+        self.object = profile
+        context = {'view': self, 'object': profile, 'profile': profile,
+                   'news_feed': news_feed, 'next_cursor': next_cursor}
+        return self.render_to_response(context)
+
+class AsyncShowOlderNewsFeedView(AsyncShowNewsFeedView):
+    '''ShowOlderNewsFeedView for ASGI.'''
+    template_name = 'mini_fb/news_feed_items.html'
@@ -8,3 +8,7 @@ from django.apps import AppConfig
 class QuotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quotes'
+
+    def ready(self):
+        """connects the signal handlers that keep Quote positions dense"""
+        from . import signals  # noqa: F401
@@ -0,0 +1,61 @@
+## quotes/management/commands/import_quotes.py
+## description: stream a quote corpus file into the Quote table
+## Always write a header comment
+import csv
+import itertools
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from quotes.models import Quote
+
+class Command(BaseCommand):
+    """Bulk-import quotes from a CSV file (text[,author] per row) or a plain text file
+    (one quote per line). The file is read row by row and written in batches, so memory
+    use does not depend on the size of the corpus."""
+    help = 'Import quotes from a .csv (text,author) or .txt (one quote per line) file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=['csv', 'txt'],
+                            help='File format (default: from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Quotes inserted per query.')
+        parser.add_argument('--skip-header', action='store_true', help='Ignore the first row of a CSV file.')
+
+    def rows(self, f, file_format, skip_header):
+        """yields (text, author) for each quote in the open file f"""
+        if file_format == 'csv':
+            reader = csv.reader(f)
+            if skip_header:
+                next(reader, None)
+            for row in reader:
+                if row and row[0].strip():
+                    yield row[0].strip(), (row[1].strip() if len(row) > 1 else '')
+        else:
+            for line in f:
+                if line.strip():
+                    yield line.strip(), ''
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'txt')
+        batch_size = options['batch_size']
+        total = 0
+        try:
+            f = open(path, newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(e)
+        with f:
+            rows = self.rows(f, file_format, options['skip_header'])
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    # positions continue from the current end, keeping them dense
+                    position = Quote.objects.next_position()
+                    Quote.objects.bulk_create([Quote(text=text, author=author, position=position + i)
+                                               for i, (text, author) in enumerate(batch)])
+                total += len(batch)
+                self.stdout.write(f'{total} quotes imported...', ending='\r')
+        self.stdout.write(self.style.SUCCESS(f'Imported {total} quotes.'))
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Quote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('author', models.TextField(blank=True)),
+                ('position', models.PositiveIntegerField(unique=True)),
+            ],
+        ),
+    ]
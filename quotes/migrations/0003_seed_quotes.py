@@ -0,0 +1,33 @@
+# Move the quotes that used to be hard-coded in quotes/views.py into the Quote table.
+
+from django.db import migrations
+
+CAMUS_QUOTES = [
+    "The only way to deal with an unfree world is to become so absolutely free that your very existence is an act of rebellion.",
+    "Don't walk behind me; I may not lead. Don't walk in front of me; I may not follow. Just walk beside me and be my friend.",
+    "Sometimes, carrying on, just carrying on, is the superhuman achievement.",
+    "In the depths of winter, I finally learned that within me there lay an invincible summer.",
+    "There is no love of life without the despair of life.",
+]
+
+def seed_quotes(apps, schema_editor):
+    Quote = apps.get_model('quotes', 'Quote')
+    if Quote.objects.exists():
+        return
+    Quote.objects.bulk_create([Quote(text=text, author='Albert Camus', position=i)
+                               for i, text in enumerate(CAMUS_QUOTES)])
+
+def unseed_quotes(apps, schema_editor):
+    Quote = apps.get_model('quotes', 'Quote')
+    Quote.objects.filter(text__in=CAMUS_QUOTES).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quotes', '0002_quote'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_quotes, unseed_quotes),
+    ]
@@ -2,8 +2,55 @@
 ## description: Model patterns for the quotes app
 ## Always write a header comment
 
-from django.db import models
+from django.db import connection, models
+import random
+
+#key of the PostgreSQL advisory lock that serializes renumbering positions
+POSITION_LOCK_ID = 0x71756f7465
 
 # Create your models here.
 class Post(models.Model):
-    banner = models.ImageField(blank=True)
\ No newline at end of file
+    banner = models.ImageField(blank=True)
+
+class QuoteManager(models.Manager):
+    """Manager for Quote with constant-time random sampling"""
+
+    def random(self, rng=random):
+        """returns one Quote chosen with rng (None if there are none).
+        Quote positions are dense (0..n-1), so this is an indexed MAX() and an indexed
+        lookup instead of ORDER BY RANDOM() over the whole table"""
+        last = self.aggregate(last=models.Max('position'))['last']
+        if last is None:
+            return None
+        position = rng.randint(0, last)
+        # the nearest following position, in case a delete left a gap
+        return self.filter(position__gte=position).order_by('position').first()
+
+    def lock_positions(self):
+        """blocks other transactions that call this until the current one ends, so the
+        renumbering after a delete (quotes/signals.py) sees every earlier delete.
+        must be called inside a transaction, before anything is deleted"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [POSITION_LOCK_ID])
+        else:
+            #sqlite runs one writing transaction at a time; other databases lock the highest row
+            list(self.select_for_update().order_by('-position')[:1])
+
+    def next_position(self):
+        """returns the position to give the next Quote added"""
+        last = self.aggregate(last=models.Max('position'))['last']
+        return 0 if last is None else last + 1
+
+class Quote(models.Model):
+    """A quote in the quote-of-the-day corpus"""
+    text = models.TextField(blank=False)
+    author = models.TextField(blank=True)
+    #dense 0..n-1 numbering used for random sampling (kept dense by quotes/signals.py)
+    position = models.PositiveIntegerField(unique=True)
+
+    objects = QuoteManager()
+
+    def __str__(self):
+        """returns a string representation of this Quote"""
+        return f'{self.text} ({self.author})' if self.author else self.text
@@ -0,0 +1,21 @@
+## quotes/signals.py
+## description: signal handlers for the quotes app
+## Always write a header comment
+from django.db.models.signals import pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Quote
+
+@receiver(pre_delete, sender=Quote)
+def quote_deleting(sender, instance, **kwargs):
+    """serializes deletes, so two of them can not move the same last Quote
+    (pre_delete runs inside the delete's transaction)"""
+    Quote.objects.lock_positions()
+
+@receiver(post_delete, sender=Quote)
+def quote_deleted(sender, instance, **kwargs):
+    """fills the hole a deleted Quote leaves in the positions with the last Quote,
+    so positions stay dense for Quote.objects.random()"""
+    last = Quote.objects.order_by('-position').first()
+    if last is not None and last.position > instance.position:
+        Quote.objects.filter(pk=last.pk).update(position=instance.position)
@@ -1,3 +1,106 @@
-from django.test import TestCase
+## quotes/tests.py
+## description: tests for the quotes app
+## Always write a header comment
+import random
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from .models import Quote
+from .views import SHOW_ALL_PAGE_SIZE
+
+class QuotePositionTest(TestCase):
+    """deletes keep quote positions dense (0..n-1) for Quote.objects.random()"""
+
+    def setUp(self):
+        Quote.objects.all().delete()
+        for i in range(6):
+            Quote.objects.create(text=f'quote {i}', position=Quote.objects.next_position())
+
+    def positions(self):
+        return list(Quote.objects.order_by('position').values_list('position', flat=True))
+
+    def test_delete_moves_last_quote_into_the_hole(self):
+        Quote.objects.get(text='quote 1').delete()
+        self.assertEqual(self.positions(), list(range(5)))
+        self.assertEqual(Quote.objects.get(text='quote 5').position, 1)
+
+    def test_deletes_keep_positions_dense(self):
+        for text in ['quote 0', 'quote 5', 'quote 3']:
+            Quote.objects.get(text=text).delete()
+            self.assertEqual(self.positions(), list(range(Quote.objects.count())))
+        Quote.objects.filter(text__in=['quote 1', 'quote 2']).delete()
+        self.assertEqual(self.positions(), [0])
+
+    def test_random(self):
+        Quote.objects.get(text='quote 2').delete()
+        rng = random.Random(412)
+        texts = {Quote.objects.random(rng).text for i in range(50)}
+        self.assertEqual(texts, set(Quote.objects.values_list('text', flat=True)))
+        Quote.objects.all().delete()
+        self.assertIsNone(Quote.objects.random())
+
+class ShowAllTest(TestCase):
+    """the show_all page lists the quotes a page at a time"""
+
+    def test_more_quotes_link(self):
+        Quote.objects.all().delete()
+        Quote.objects.bulk_create([Quote(text=f'quote {i}', position=i) for i in range(SHOW_ALL_PAGE_SIZE + 3)])
+        url = reverse('show_all_quotes')
+        response = self.client.get(url)
+        next_url = f'{url}?after={SHOW_ALL_PAGE_SIZE - 1}'
+        self.assertContains(response, f'href="{next_url}"')
+        self.assertEqual(len(response.context['quotes']), SHOW_ALL_PAGE_SIZE)
+
+        response = self.client.get(next_url)
+        self.assertEqual(response.context['quotes'], [f'quote {i}' for i in range(SHOW_ALL_PAGE_SIZE, SHOW_ALL_PAGE_SIZE + 3)])
+        self.assertNotContains(response, 'More quotes')
+
+@override_settings(QUOTES_ROTATION_SECONDS=3600)
+class RotatingQuoteTest(TestCase):
+    """the quote pages show one quote per rotation bucket, with headers that let clients cache it"""
+
+    #a time 600 seconds into a bucket
+    now = 3600 * 500000 + 600
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url='/quotes/quote/', now=now, **headers):
+        with mock.patch('quotes.views.time.time', return_value=now):
+            return self.client.get(url, headers=headers)
+
+    def test_caching_headers(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3000')
+        self.assertEqual(response['ETag'], '"quotes/quote.html:500000"')
+        self.assertEqual(response['Last-Modified'], http_date(3600 * 500000))
+        self.assertNotEqual(self.get('/quotes/')['ETag'], response['ETag'])
+        self.assertEqual(self.get(now=self.now + 3600)['ETag'], '"quotes/quote.html:500001"')
+
+    def test_same_page_within_a_bucket(self):
+        first = self.get().content
+        Quote.objects.all().delete()
+        # served from the cache, without picking again
+        self.assertEqual(self.get(now=self.now + 100).content, first)
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.get(**{'If-Modified-Since': http_date(3600 * 500000)}).status_code, 304)
+        self.assertEqual(self.get(now=self.now + 3600, **{'If-None-Match': etag}).status_code, 200)
+
+    @override_settings(QUOTES_ROTATION_SECONDS=0)
+    def test_rotation_disabled_is_never_cached(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
@@ -8,6 +8,6 @@ from .views import *
 urlpatterns = [
     path('', base_page_view),
     path('quote/', quote_page_view),
-    path('show_all/', showall_page_view),
+    path('show_all/', showall_page_view, name='show_all_quotes'),
     path('about/', about_page_view),
 ]
\ No newline at end of file
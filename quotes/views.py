@@ -4,45 +4,96 @@
 
 from django.shortcuts import render
 from django.http import HttpRequest, HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.views.decorators.http import condition
+import datetime
 import random
+import time
+
+from .models import Quote
 
 # Create your views here.
-quote_list = ["The only way to deal with an unfree world is to become so absolutely free that your very existence is an act of rebellion.",
-              "Don't walk behind me; I may not lead. Don't walk in front of me; I may not follow. Just walk beside me and be my friend.",
-              "Sometimes, carrying on, just carrying on, is the superhuman achievement.",
-              "In the depths of winter, I finally learned that within me there lay an invincible summer.",
-              "There is no love of life without the despair of life."]
+#number of quotes shown per show_all page
+SHOW_ALL_PAGE_SIZE = 50
+
 image_list = ['/media/camus1.jpg',
               '/media/camus2.jpg',
               '/media/camus3.jpg',
               '/media/camus4.jpg',
               '/media/camus5.jpg']
 
-def base_page_view(request):
-    """provides the functionality for the base page"""
-    randQuoteIndex = random.randint(0,len(quote_list)-1)
-    randImgIndex = random.randint(0,len(image_list)-1)
-    randQuote = quote_list[randQuoteIndex]
-    randImg = image_list[randImgIndex]
-    context = {"quote": randQuote,
-               "image": randImg}
-    
-    return render(request, "quotes/base.html", context)
-
-def quote_page_view(request):
-    """provides the functionality for the quote page"""
-    randQuoteIndex = random.randint(0,len(quote_list)-1)
-    randImgIndex = random.randint(0,len(image_list)-1)
-    randQuote = quote_list[randQuoteIndex]
-    randImg = image_list[randImgIndex]
-    context = {"quote": randQuote,
-               "image": randImg}
-    return render(request, "quotes/quote.html", context)
+def rotation_bucket(now=None):
+    """returns (bucket number, bucket start, bucket end) of the current rotation period,
+    or None when settings.QUOTES_ROTATION_SECONDS is 0 (a new random quote on every request)"""
+    period = getattr(settings, 'QUOTES_ROTATION_SECONDS', 0)
+    if not period:
+        return None
+    now = time.time() if now is None else now
+    bucket = int(now // period)
+    return bucket, bucket * period, (bucket + 1) * period
+
+def pick_quote(bucket=None):
+    """returns the context for a quote page: a random quote and image,
+    or the same quote and image for everybody within a rotation bucket"""
+    # seeding with the bucket number makes the choice deterministic within the bucket
+    rng = random.Random(bucket) if bucket is not None else random
+    quote = Quote.objects.random(rng)
+    return {"quote": quote.text if quote else "",
+            "image": image_list[rng.randint(0, len(image_list) - 1)]}
+
+def rotating_quote_view(template_name):
+    """returns a view rendering template_name with the quote of the current rotation bucket.
+    Within a bucket the page is rendered once and served from the cache, and responses carry
+    Cache-Control/ETag/Last-Modified headers so browsers and proxies can cache it too."""
+    def etag(request):
+        current = rotation_bucket()
+        return f'{template_name}:{current[0]}' if current else None
+
+    def last_modified(request):
+        current = rotation_bucket()
+        return datetime.datetime.fromtimestamp(current[1], tz=datetime.timezone.utc) if current else None
+
+    @condition(etag_func=etag, last_modified_func=last_modified)
+    def view(request):
+        current = rotation_bucket()
+        if current is None:
+            # rotation disabled: the original random quote per request, never cached
+            response = render(request, template_name, pick_quote())
+            add_never_cache_headers(response)
+            return response
+        bucket, start, end = current
+        remaining = max(1, int(end - time.time()))
+        key = f'quotes:{template_name}:{bucket}'
+        content = cache.get(key)
+        if content is None:
+            content = render(request, template_name, pick_quote(bucket)).content
+            cache.set(key, content, remaining)
+        response = HttpResponse(content)
+        patch_cache_control(response, public=True, max_age=remaining)
+        return response
+    return view
+
+# provides the functionality for the base page
+base_page_view = rotating_quote_view("quotes/base.html")
+
+# provides the functionality for the quote page
+quote_page_view = rotating_quote_view("quotes/quote.html")
 
 def showall_page_view(request):
-    """provides the functionality for the show_all page"""
+    """provides the functionality for the show_all page: one page of quotes,
+    in position order, starting after the ?after= position"""
+    quotes = Quote.objects.order_by('position')
+    after = request.GET.get('after', '')
+    if after.isdigit():
+        quotes = quotes.filter(position__gt=int(after))
+    # fetch one extra quote to find out whether there is another page
+    quotes = list(quotes[:SHOW_ALL_PAGE_SIZE + 1])
+    next_after = quotes[SHOW_ALL_PAGE_SIZE - 1].position if len(quotes) > SHOW_ALL_PAGE_SIZE else None
     context = {"images" : image_list,
-               "quotes": quote_list}
+               "quotes": [q.text for q in quotes[:SHOW_ALL_PAGE_SIZE]],
+               "next_after": next_after}
     return render(request, "quotes/show_all.html", context)
 
 def about_page_view(request):
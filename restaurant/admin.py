@@ -1,3 +1,9 @@
 from django.contrib import admin
 
 # Register your models here.
+from .models import MenuItem, Order, OrderLine, SalesRollup
+
+admin.site.register(MenuItem)
+admin.site.register(Order)
+admin.site.register(OrderLine)
+admin.site.register(SalesRollup)
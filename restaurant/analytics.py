@@ -0,0 +1,114 @@
+## restaurant/analytics.py
+# Incrementally maintained sales rollups (SalesRollup) for the sales dashboard.
+# record_sales is called by restaurant/orders.py as orders are written and adds them onto
+# one row per (hour, item, side); compact and rebuild are used by the compact_sales_rollups
+# management command.
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+
+from .models import MenuItem, OrderLine, SalesRollup
+
+#rows per INSERT, or pks per DELETE
+BATCH_SIZE = 500
+
+def hour_bucket(when):
+    """returns the start of the (UTC) hour containing when"""
+    return when.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+def day_bucket(when):
+    """returns the start of the (UTC) day containing when"""
+    return hour_bucket(when).replace(hour=0)
+
+def _add_to_rollups(totals, period):
+    """add {(bucket, item_id, side_id): [quantity, revenue]} onto the rollup row of each key,
+    creating the rows that do not exist yet"""
+    for (bucket, item_id, side_id), (quantity, revenue) in totals.items():
+        key = {'period': period, 'bucket': bucket, 'item_id': item_id, 'side_id': side_id}
+        increment = {'quantity': F('quantity') + quantity, 'revenue': F('revenue') + revenue}
+        if SalesRollup.objects.filter(**key).update(**increment):
+            continue
+        try:
+            with transaction.atomic():
+                SalesRollup.objects.create(quantity=quantity, revenue=revenue, **key)
+        except IntegrityError:
+            #another transaction created the row since the update above
+            SalesRollup.objects.filter(**key).update(**increment)
+
+def record_sales(pairs):
+    """add a batch of (Order, [OrderLine]) pairs to the hourly rollups (one row per hour, item and side).
+    must be called inside the transaction that saves the orders"""
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for order, lines in pairs:
+        bucket = hour_bucket(order.placed_at)
+        for line in lines:
+            total = totals[(bucket, line.item_id, line.side_id)]
+            total[0] += 1
+            total[1] += line.price
+    _add_to_rollups(totals, SalesRollup.HOUR)
+
+def compact(day_before):
+    """fold the hourly rollup rows older than day_before into daily rows.
+    returns (hourly rows folded, daily rows written)"""
+    with transaction.atomic():
+        rows = list(SalesRollup.objects.select_for_update()
+                    .filter(period=SalesRollup.HOUR, bucket__lt=day_before)
+                    .values_list('pk', 'bucket', 'item_id', 'side_id', 'quantity', 'revenue'))
+        totals = defaultdict(lambda: [0, Decimal(0)])
+        for pk, bucket, item_id, side_id, quantity, revenue in rows:
+            total = totals[(day_bucket(bucket), item_id, side_id)]
+            total[0] += quantity
+            total[1] += revenue
+        _add_to_rollups(totals, SalesRollup.DAY)
+        #delete only the rows counted above, never rows written since
+        pks = [row[0] for row in rows]
+        for start in range(0, len(pks), BATCH_SIZE):
+            SalesRollup.objects.filter(pk__in=pks[start:start + BATCH_SIZE]).delete()
+    return len(rows), len(totals)
+
+def _lock_rollups():
+    """block other transactions from writing rollups until this one ends"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {SalesRollup._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+    #sqlite has a single writer: the DELETE in rebuild() takes the write lock before anything is read
+
+def rebuild():
+    """recompute the hourly rollups from the orders table. returns the number of rollup rows"""
+    with transaction.atomic():
+        #lock and clear first, so every order is either counted here or added by record_sales after
+        _lock_rollups()
+        SalesRollup.objects.all().delete()
+        totals = (OrderLine.objects
+                  .values('item_id', 'side_id', bucket=TruncHour('order__placed_at', tzinfo=datetime.timezone.utc))
+                  .annotate(quantity=Count('id'), revenue=Sum('price'))
+                  .order_by())
+        rows = [SalesRollup(period=SalesRollup.HOUR, **total) for total in totals]
+        SalesRollup.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+def sales_by_item(since):
+    """returns [{item__name, item__kind, quantity, revenue}] sold since the given time, best sellers first"""
+    return (SalesRollup.objects.filter(bucket__gte=since)
+            .values('item__name', 'item__kind')
+            .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+            .order_by('-quantity', 'item__name'))
+
+def sales_by_side(since):
+    """returns [{side__name, quantity}] of the sides chosen since the given time (None is no side)"""
+    return (SalesRollup.objects.filter(bucket__gte=since, item__kind=MenuItem.MEAL)
+            .values('side__name')
+            .annotate(quantity=Sum('quantity'))
+            .order_by('-quantity'))
+
+def sales_by_hour(since):
+    """returns [{bucket, quantity, revenue}] for each hour since the given time that is still
+    kept at hourly resolution"""
+    return (SalesRollup.objects.filter(period=SalesRollup.HOUR, bucket__gte=since)
+            .values('bucket')
+            .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+            .order_by('bucket'))
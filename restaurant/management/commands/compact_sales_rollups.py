@@ -0,0 +1,31 @@
+## restaurant/management/commands/compact_sales_rollups.py
+# Fold old hourly SalesRollup rows into daily rows (optionally rebuilding them from the orders first).
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from restaurant import analytics
+
+class Command(BaseCommand):
+    """Compact (or rebuild) the restaurant sales rollups"""
+    help = 'Compact the restaurant sales rollups (SalesRollup); hourly rows older than --hourly-days become daily rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hourly-days', type=int, default=31,
+                            help='Keep hourly resolution for this many days (default 31; 0 keeps every hour).')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute the rollups from the orders table before compacting.')
+
+    def handle(self, *args, **options):
+        days = options['hourly_days']
+        if days < 0:
+            raise CommandError('--hourly-days must not be negative.')
+        if options['rebuild']:
+            count = analytics.rebuild()
+            self.stdout.write(f'Rebuilt {count} hourly rollup rows from the orders table.')
+        if not days:
+            return
+        day_before = analytics.day_bucket(timezone.now() - datetime.timedelta(days=days))
+        folded, written = analytics.compact(day_before)
+        self.stdout.write(self.style.SUCCESS(f'Folded {folded} hourly rollup rows into {written} daily rows.'))
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50, unique=True)),
+                ('name', models.TextField()),
+                ('kind', models.CharField(choices=[('meal', 'Meal'), ('side', 'Side'), ('special', 'Daily special')], max_length=10)),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('active', models.BooleanField(default=True)),
+                ('sort_order', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['kind', 'sort_order', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.TextField()),
+                ('phone', models.TextField(blank=True)),
+                ('email', models.TextField(blank=True)),
+                ('instructions', models.TextField(blank=True)),
+                ('placed_at', models.DateTimeField()),
+                ('ready_at', models.DateTimeField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='restaurant.menuitem')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='restaurant.order')),
+                ('side', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='restaurant.menuitem')),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Move the menu and prices that used to be hard-coded in restaurant/views.py
+# and restaurant/order.html into the MenuItem table.
+
+from decimal import Decimal
+
+from django.db import migrations
+
+MEALS = [
+    ('meal1', 'Meal 1', '10.99'),
+    ('meal2', 'Meal 2', '12.99'),
+    ('meal3', 'Meal 3', '11.99'),
+    ('meal4', 'Meal 4', '13.99'),
+]
+
+SIDES = [
+    ('Sauerkraut', 'Sauerkraut'),
+    ('Potato', 'Potato Salad'),
+]
+
+SPECIALS = [
+    ('schnitzel', 'Schnitzel', '15.99'),
+    ('schweinshaxen', 'Schweinshaxen', '22.99'),
+    ('blaukraut-salat', 'Blaukraut Salat', '7.99'),
+    ('sauerkraut-salat', 'Sauerkraut Salat', '7.99'),
+    ('leberkase', 'Leberkase', '10.99'),
+]
+
+def seed_menu(apps, schema_editor):
+    MenuItem = apps.get_model('restaurant', 'MenuItem')
+    if MenuItem.objects.exists():
+        return
+    items = []
+    for i, (code, name, price) in enumerate(MEALS):
+        items.append(MenuItem(code=code, name=name, kind='meal', price=Decimal(price), sort_order=i))
+    for i, (code, name) in enumerate(SIDES):
+        items.append(MenuItem(code=code, name=name, kind='side', sort_order=i))
+    for i, (code, name, price) in enumerate(SPECIALS):
+        items.append(MenuItem(code=code, name=name, kind='special', price=Decimal(price), sort_order=i))
+    MenuItem.objects.bulk_create(items)
+
+def unseed_menu(apps, schema_editor):
+    MenuItem = apps.get_model('restaurant', 'MenuItem')
+    OrderLine = apps.get_model('restaurant', 'OrderLine')
+    codes = [m[0] for m in MEALS] + [s[0] for s in SIDES] + [s[0] for s in SPECIALS]
+    #items that have been ordered are kept so the orders still refer to them
+    MenuItem.objects.filter(code__in=codes) \
+        .exclude(pk__in=OrderLine.objects.values('item')) \
+        .exclude(pk__in=OrderLine.objects.filter(side__isnull=False).values('side')) \
+        .delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0001_orders'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_menu, unseed_menu),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:38
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+
+
+def backfill_rollups(apps, schema_editor):
+    # roll up the orders stored before SalesRollup existed
+    OrderLine = apps.get_model('restaurant', 'OrderLine')
+    SalesRollup = apps.get_model('restaurant', 'SalesRollup')
+    totals = (OrderLine.objects
+              .values('item_id', 'side_id', bucket=TruncHour('order__placed_at', tzinfo=datetime.timezone.utc))
+              .annotate(quantity=Count('id'), revenue=Sum('price'))
+              .order_by())
+    SalesRollup.objects.bulk_create([SalesRollup(period='hour', **total) for total in totals], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_seed_menu'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], default='hour', max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='restaurant.menuitem')),
+                ('side', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='restaurant.menuitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'bucket'], name='salesrollup_period_bucket_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('side__isnull', False)), fields=('period', 'bucket', 'item', 'side'), name='unique_salesrollup_with_side'), models.UniqueConstraint(condition=models.Q(('side__isnull', True)), fields=('period', 'bucket', 'item'), name='unique_salesrollup_without_side')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
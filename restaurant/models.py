@@ -1,3 +1,92 @@
+## restaurant/models.py
+## description: Model patterns for the restaurant app
+## Always write a header comment
+
 from django.db import models
+from django.db.models import Q
 
 # Create your models here.
+class MenuItem(models.Model):
+    """An item on the menu: a numbered meal, a side, or a daily special"""
+    MEAL = 'meal'
+    SIDE = 'side'
+    SPECIAL = 'special'
+    KINDS = [(MEAL, 'Meal'), (SIDE, 'Side'), (SPECIAL, 'Daily special')]
+
+    #short stable identifier used in forms and in the JSON order endpoint (e.g. 'meal1', 'Potato')
+    code = models.CharField(max_length=50, unique=True)
+    name = models.TextField(blank=False)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    price = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    #items that are no longer sold stay in the table so old orders still refer to them
+    active = models.BooleanField(default=True)
+    #order on the menu
+    sort_order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['kind', 'sort_order', 'id']
+
+    def __str__(self):
+        """returns a string representation of this MenuItem"""
+        return f'{self.name} (${self.price})'
+
+class Order(models.Model):
+    """An order placed with the restaurant"""
+    name = models.TextField(blank=False)
+    phone = models.TextField(blank=True)
+    email = models.TextField(blank=True)
+    instructions = models.TextField(blank=True)
+    placed_at = models.DateTimeField()
+    ready_at = models.DateTimeField()
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        """returns a string representation of this Order"""
+        return f'Order {self.pk} for {self.name} (${self.total})'
+
+class OrderLine(models.Model):
+    """One item of an Order, with the side chosen for it (if any)"""
+    order = models.ForeignKey("Order", on_delete=models.CASCADE, related_name='lines')
+    item = models.ForeignKey("MenuItem", on_delete=models.PROTECT, related_name='+')
+    side = models.ForeignKey("MenuItem", on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    #the item's price when the order was placed
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+
+    def __str__(self):
+        """returns the receipt line for this OrderLine"""
+        if self.item.kind == MenuItem.SPECIAL:
+            return self.item.name
+        side = f'Side {self.side.name}' if self.side else 'no side'
+        return f'{self.item.name} with {side}'
+
+class SalesRollup(models.Model):
+    """Pre-aggregated sales of one item (with one side) in one hour or day.
+    There is one row per (period, bucket, item, side); each batch of orders adds onto it
+    (see restaurant/analytics.py), and compact_sales_rollups folds old hours into days."""
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIODS = [(HOUR, 'Hour'), (DAY, 'Day')]
+
+    period = models.CharField(max_length=4, choices=PERIODS, default=HOUR)
+    #start of the hour/day (UTC)
+    bucket = models.DateTimeField()
+    item = models.ForeignKey("MenuItem", on_delete=models.PROTECT, related_name='+')
+    side = models.ForeignKey("MenuItem", on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['period', 'bucket'], name='salesrollup_period_bucket_idx'),
+        ]
+        #NULLs never conflict in a unique index, so sales without a side get their own constraint
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'bucket', 'item', 'side'], condition=Q(side__isnull=False),
+                                    name='unique_salesrollup_with_side'),
+            models.UniqueConstraint(fields=['period', 'bucket', 'item'], condition=Q(side__isnull=True),
+                                    name='unique_salesrollup_without_side'),
+        ]
+
+    def __str__(self):
+        """returns a string representation of this SalesRollup"""
+        return f'{self.bucket:%Y-%m-%d %H:%M} {self.item_id}/{self.side_id}: {self.quantity} (${self.revenue})'
@@ -0,0 +1,92 @@
+## restaurant/orders.py
+# Turning submitted orders into Order and OrderLine rows.
+# Used by the order form (confirmation_view) and the batched JSON endpoint (order_batch_view).
+import datetime
+import random
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import MenuItem, Order, OrderLine
+from .analytics import record_sales
+
+#largest number of orders accepted in one batch
+MAX_BATCH = 500
+#largest number of items accepted in one order
+MAX_ITEMS = 100
+#rows per INSERT when bulk creating
+BATCH_SIZE = 500
+
+class OrderError(ValueError):
+    """raised when a submitted order refers to unknown items or is missing fields"""
+
+def get_menu():
+    """returns the active menu as a dict of code -> MenuItem"""
+    return {item.code: item for item in MenuItem.objects.filter(active=True)}
+
+def ready_time(placed_at):
+    """returns a random time (30-60min after placed_at) at which the order will be ready"""
+    return placed_at + datetime.timedelta(minutes=random.randint(30, 60))
+
+def build_order(data, menu, placed_at=None):
+    """validate one order and return an unsaved (Order, [OrderLine]) pair.
+    data is a dict with name, phone, email, instructions and a list of items,
+    each {'item': <code>, 'side': <code or None>}. prices come from the menu, never from data."""
+    if not isinstance(data, dict):
+        raise OrderError('each order must be an object')
+    name = data.get('name')
+    if not isinstance(name, str) or not name.strip():
+        raise OrderError('name is required')
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        raise OrderError('an order needs at least one item')
+    if len(items) > MAX_ITEMS:
+        raise OrderError(f'an order can have at most {MAX_ITEMS} items')
+
+    lines = []
+    for entry in items:
+        if not isinstance(entry, dict):
+            raise OrderError('each item must be an object')
+        code, side_code = entry.get('item'), entry.get('side')
+        #codes are looked up in a dict, so lists and objects must not get that far
+        if not isinstance(code, str) or not isinstance(side_code, (str, type(None))):
+            raise OrderError('item and side codes must be strings')
+        item = menu.get(code)
+        if item is None or item.kind == MenuItem.SIDE:
+            raise OrderError(f"unknown item {code!r}")
+        side = None
+        if side_code:
+            side = menu.get(side_code)
+            if side is None or side.kind != MenuItem.SIDE or item.kind != MenuItem.MEAL:
+                raise OrderError(f"unknown side {entry['side']!r} for {item.code!r}")
+        lines.append(OrderLine(item=item, side=side, price=item.price))
+
+    placed_at = placed_at or timezone.now()
+    order = Order(name=name.strip(),
+                  phone=str(data.get('phone') or ''),
+                  email=str(data.get('email') or ''),
+                  instructions=str(data.get('instructions') or ''),
+                  placed_at=placed_at,
+                  ready_at=ready_time(placed_at),
+                  total=sum((line.price for line in lines), start=0))
+    return order, lines
+
+def save_orders(pairs):
+    """write a batch of (Order, [OrderLine]) pairs in one transaction, returns the saved Orders"""
+    orders = [order for order, lines in pairs]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Order.objects.bulk_create(orders, batch_size=BATCH_SIZE)
+        else:
+            #without RETURNING the new primary keys are unknown, so the orders are inserted one by one
+            for order in orders:
+                order.save(force_insert=True)
+        all_lines = []
+        for order, lines in pairs:
+            for line in lines:
+                line.order = order
+            all_lines.extend(lines)
+        OrderLine.objects.bulk_create(all_lines, batch_size=BATCH_SIZE)
+        #keep the sales dashboard's rollups up to date in the same transaction
+        record_sales(pairs)
+    return orders
@@ -1,3 +1,170 @@
-from django.test import TestCase
+## restaurant/tests.py
+# Tests for the restaurant app
 
-# Create your tests here.
+import datetime
+import json
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import MenuItem, Order, OrderLine, SalesRollup
+from .orders import MAX_BATCH, MAX_ITEMS, OrderError, build_order, get_menu, save_orders
+from . import analytics
+
+def place(menu, placed_at, *items):
+    """saves one order of (item code, side code or None) pairs placed at placed_at"""
+    data = {'name': 'Test', 'items': [{'item': item, 'side': side} for item, side in items]}
+    return save_orders([build_order(data, menu, placed_at)])[0]
+
+class OrderTest(TestCase):
+    """orders are validated against the menu before anything is written"""
+
+    def setUp(self):
+        self.menu = get_menu()
+
+    def test_build_order_uses_menu_prices(self):
+        data = {'name': ' Bilbo ', 'phone': 111, 'items': [{'item': 'meal1', 'side': 'Potato', 'price': '0.01'},
+                                                            {'item': 'schnitzel'}]}
+        order, lines = build_order(data, self.menu)
+        self.assertEqual(order.name, 'Bilbo')
+        self.assertEqual(order.phone, '111')
+        self.assertEqual([(line.item.code, line.side and line.side.code, line.price) for line in lines],
+                         [('meal1', 'Potato', Decimal('10.99')), ('schnitzel', None, Decimal('15.99'))])
+        self.assertEqual(order.total, Decimal('26.98'))
+        self.assertTrue(datetime.timedelta(minutes=30) <= order.ready_at - order.placed_at <= datetime.timedelta(hours=1))
+
+    def test_build_order_rejects_invalid_orders(self):
+        invalid = [
+            [],
+            {'items': [{'item': 'meal1'}]},
+            {'name': '  ', 'items': [{'item': 'meal1'}]},
+            {'name': 'Sam', 'items': []},
+            {'name': 'Sam', 'items': 'meal1'},
+            {'name': 'Sam', 'items': ['meal1']},
+            {'name': 'Sam', 'items': [{'item': 'lembas'}]},
+            {'name': 'Sam', 'items': [{'item': 'Potato'}]},
+            {'name': 'Sam', 'items': [{'item': 'meal1', 'side': 'meal2'}]},
+            {'name': 'Sam', 'items': [{'item': 'schnitzel', 'side': 'Potato'}]},
+            {'name': 'Sam', 'items': [{'item': ['meal2']}]},
+            {'name': 'Sam', 'items': [{'item': 'meal1', 'side': {'a': 1}}]},
+            {'name': 'Sam', 'items': [{'item': 'meal1', 'side': ['Potato']}]},
+            {'name': 'Sam', 'items': [{'item': 'schnitzel'}] * (MAX_ITEMS + 1)},
+        ]
+        for data in invalid:
+            with self.assertRaises(OrderError, msg=data):
+                build_order(data, self.menu)
+
+    def test_inactive_items_cannot_be_ordered(self):
+        MenuItem.objects.filter(code='meal2').update(active=False)
+        with self.assertRaises(OrderError):
+            build_order({'name': 'Sam', 'items': [{'item': 'meal2'}]}, get_menu())
+
+    def test_save_orders(self):
+        pairs = [build_order({'name': f'Hobbit {i}', 'items': [{'item': 'meal1'}, {'item': 'meal2'}]}, self.menu)
+                 for i in range(3)]
+        saved = save_orders(pairs)
+        self.assertEqual([order.name for order in Order.objects.order_by('pk')], ['Hobbit 0', 'Hobbit 1', 'Hobbit 2'])
+        for order in saved:
+            self.assertEqual(OrderLine.objects.filter(order=order).count(), 2)
+        self.assertEqual(sum(SalesRollup.objects.values_list('quantity', flat=True)), 6)
+
+@override_settings(RESTAURANT_ORDER_TOKEN='s3cret')
+class OrderBatchViewTest(TestCase):
+    """the batch endpoint needs the bearer token and writes all of a batch or none of it"""
+
+    def post(self, body, token='s3cret'):
+        headers = {'Authorization': f'Bearer {token}'} if token is not None else {}
+        return self.client.post(reverse('order_batch'), json.dumps(body) if not isinstance(body, str) else body,
+                                content_type='application/json', headers=headers)
+
+    def test_batch(self):
+        response = self.post({'orders': [{'name': 'Merry', 'items': [{'item': 'meal3', 'side': 'Sauerkraut'}]},
+                                         {'name': 'Pippin', 'items': [{'item': 'leberkase'}]}]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([order['total'] for order in response.json()['orders']], ['11.99', '10.99'])
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_auth_failures(self):
+        body = {'orders': [{'name': 'Merry', 'items': [{'item': 'meal3'}]}]}
+        for token in [None, '', 'wrong', 's3cret ', 'sécret', '\u2603']:
+            response = self.post(body, token)
+            self.assertEqual(response.status_code, 401, token)
+            self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        with override_settings(RESTAURANT_ORDER_TOKEN=''):
+            self.assertEqual(self.post(body, '').status_code, 401)
+        self.assertEqual(self.client.get(reverse('order_batch')).status_code, 405)
+        self.assertFalse(Order.objects.exists())
+
+    def test_invalid_batches_write_nothing(self):
+        invalid = ['not json', [], {'orders': []}, {'orders': {}},
+                   {'orders': [{'name': 'Merry', 'items': [{'item': 'meal3'}]}, {'name': 'Pippin', 'items': []}]},
+                   {'orders': [{'name': 'Merry', 'items': [{'item': ['meal2']}]}]},
+                   {'orders': [{'name': 'Merry', 'items': [{'item': 'meal3', 'side': {'a': 1}}]}]},
+                   {'orders': [{'name': 'Merry', 'items': [{'item': 'meal3'}]}] * (MAX_BATCH + 1)}]
+        for body in invalid:
+            self.assertEqual(self.post(body).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+class SalesRollupTest(TestCase):
+    """the rollups keep one row per (period, bucket, item, side) and always add up to the orders"""
+
+    def setUp(self):
+        self.menu = get_menu()
+        self.now = datetime.datetime(2026, 10, 17, 12, 30, tzinfo=datetime.timezone.utc)
+
+    def rollups(self, **filters):
+        """returns {(period, bucket, item code, side code): (quantity, revenue)}"""
+        return {(r.period, r.bucket, r.item.code, r.side.code if r.side else None): (r.quantity, r.revenue)
+                for r in SalesRollup.objects.filter(**filters).select_related('item', 'side')}
+
+    def test_orders_add_onto_one_row_per_key(self):
+        place(self.menu, self.now, ('meal1', 'Potato'), ('meal1', 'Potato'), ('schnitzel', None))
+        place(self.menu, self.now + datetime.timedelta(minutes=10), ('meal1', 'Potato'), ('schnitzel', None))
+        place(self.menu, self.now + datetime.timedelta(hours=1), ('schnitzel', None))
+        hour = analytics.hour_bucket(self.now)
+        self.assertEqual(self.rollups(), {
+            ('hour', hour, 'meal1', 'Potato'): (3, Decimal('32.97')),
+            ('hour', hour, 'schnitzel', None): (2, Decimal('31.98')),
+            ('hour', hour + datetime.timedelta(hours=1), 'schnitzel', None): (1, Decimal('15.99')),
+        })
+
+    def test_compact_folds_old_hours_into_days(self):
+        old = self.now - datetime.timedelta(days=40)
+        place(self.menu, old, ('meal2', 'Sauerkraut'))
+        place(self.menu, old + datetime.timedelta(hours=3), ('meal2', 'Sauerkraut'), ('leberkase', None))
+        place(self.menu, self.now, ('meal2', 'Sauerkraut'))
+        day_before = analytics.day_bucket(self.now - datetime.timedelta(days=31))
+
+        self.assertEqual(analytics.compact(day_before), (3, 2))
+        day = analytics.day_bucket(old)
+        self.assertEqual(self.rollups(period=SalesRollup.DAY), {
+            ('day', day, 'meal2', 'Sauerkraut'): (2, Decimal('25.98')),
+            ('day', day, 'leberkase', None): (1, Decimal('10.99')),
+        })
+        self.assertEqual(self.rollups(period=SalesRollup.HOUR),
+                         {('hour', analytics.hour_bucket(self.now), 'meal2', 'Sauerkraut'): (1, Decimal('12.99'))})
+
+        # a late order for a compacted hour, then compacting again, adds onto the day
+        place(self.menu, old, ('leberkase', None))
+        self.assertEqual(analytics.compact(day_before), (1, 1))
+        self.assertEqual(self.rollups(period=SalesRollup.DAY)[('day', day, 'leberkase', None)], (2, Decimal('21.98')))
+
+    def test_rebuild_matches_orders(self):
+        place(self.menu, self.now, ('meal3', 'Potato'), ('meal3', None))
+        place(self.menu, self.now, ('meal3', 'Potato'))
+        expected = self.rollups()
+        SalesRollup.objects.update(quantity=0)
+        self.assertEqual(analytics.rebuild(), 2)
+        self.assertEqual(self.rollups(), expected)
+
+    def test_sales_by_item(self):
+        place(self.menu, self.now, ('meal4', 'Potato'), ('meal4', 'Sauerkraut'))
+        place(self.menu, self.now - datetime.timedelta(days=40), ('meal4', 'Potato'))
+        analytics.compact(analytics.day_bucket(self.now - datetime.timedelta(days=31)))
+        since = self.now - datetime.timedelta(days=60)
+        self.assertEqual(list(analytics.sales_by_item(since)),
+                         [{'item__name': 'Meal 4', 'item__kind': MenuItem.MEAL,
+                           'quantity': 3, 'revenue': Decimal('41.97')}])
+        self.assertEqual({row['side__name']: row['quantity'] for row in analytics.sales_by_side(since)},
+                         {'Potato Salad': 2, 'Sauerkraut': 1})
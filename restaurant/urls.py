@@ -10,4 +10,6 @@ urlpatterns = [
     path('main/', main_view, name='main'),
     path('order/', order_view, name='order'),
     path('confirmation/', confirmation_view, name='confirmation'),
+    path('orders/batch/', order_batch_view, name='order_batch'),
+    path('sales/', sales_view, name='sales'),
 ]
\ No newline at end of file
@@ -3,23 +3,21 @@
 ## Always write a header comment
 
 from django.shortcuts import render, redirect
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils import timezone
 import datetime
+import hmac
+import json
 import random
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
-daily_special = ['Schnitzel',
-              'Schweinshaxen',
-              'Blaukraut Salat',
-              'Sauerkraut Salat',
-              'Leberkase']
-              
-special_costs = ['$15.99',
-                 '$22.99',
-                 '$7.99',
-                 '$7.99',
-                 '$10.99']
-
+from .models import MenuItem
+from .orders import OrderError, MAX_BATCH, get_menu, build_order, save_orders
+from . import analytics
 
 
 # Create your views here.
@@ -29,117 +27,105 @@ def main_view(request):
     context = {}
     return render(request, "restaurant/main.html", context)
 
-def order_view(request):
+def order_view(request, error=None):
     """provides the functionality for the order page"""
-    randSpecialIndex = random.randint(0,len(daily_special)-1)
-    randSpecial = daily_special[randSpecialIndex]
-    randCost = special_costs[randSpecialIndex]
-    context = {"special_item": randSpecial,
-               "special_cost": randCost}
+    menu = get_menu().values()
+    specials = [item for item in menu if item.kind == MenuItem.SPECIAL]
+    context = {"meals": [item for item in menu if item.kind == MenuItem.MEAL],
+               "sides": [item for item in menu if item.kind == MenuItem.SIDE],
+               "special": random.choice(specials) if specials else None,
+               "error": error}
     return render(request, "restaurant/order.html", context)
 
+def form_to_order(post):
+    """converts the order form into the dict accepted by build_order"""
+    items = []
+    for key, value in post.items():
+        #each meal is a checkbox named after its code, with a radio button group side_<code>
+        if key.startswith('item_') and value == 'on':
+            code = key[len('item_'):]
+            items.append({'item': code, 'side': post.get(f'side_{code}') or None})
+    #the daily special is a checkbox with its code in a hidden field
+    if post.get('spz') == 'on':
+        items.append({'item': post.get('special_item', '')})
+
+    return {'items': items,
+            'instructions': post.get('instructions', '') or 'None',
+            'name': post.get('name', '') or 'John Doe',
+            'phone': post.get('phone', '') or 'XXX-XXX-XXXX',
+            'email': post.get('email', '') or 'johndoe@gmail.com'}
+
 def confirmation_view(request):
     """provides the functionality for the confirmation page"""
-    #Store the items that were ordered
-    template_name = 'formdata/confirmation.html'
-    total_cost = 0.0
-    ordered = []
-    #read form data
     if (request.POST):
-        meal1 = request.POST.get('meal1', '')
-        side1 = request.POST.get('side1', '')
-
-        meal2 = request.POST.get('meal2', '')
-        side2 = request.POST.get('side2', '')
-
-        meal3 = request.POST.get('meal3', '')
-        side3 = request.POST.get('side3', '')
-
-        meal4 = request.POST.get('meal4', '')
-        side4 = request.POST.get('side4', '')
-
-        spz = request.POST.get('spz', '')
-        special_item = request.POST['special_item']
-        special_cost = request.POST['special_cost']
-
-        instructions = request.POST.get('instructions', 'None')
-
-        name = request.POST.get('name', 'John Doe')
-        if(name == ''):
-            name = 'John Doe'
-        phone = request.POST.get('phone', 'XXX-XXX-XXXX')
-        if(phone == ''):
-            phone = 'XXX-XXX-XXXX'
-        email = request.POST.get('email', 'johndoe@gmail.com')
-        if(email == ''):
-            email = 'johndoe@gmail.com'
-    
-        if(meal1 == 'on'):
-            total_cost += 10.99
-            addition = "Meal 1"
-            if(side1 == 'Sauerkraut'):
-                addition += " with Side Sauerkraut"
-            elif(side1 == 'Potato'):
-                addition += " with Side Potato Salad"
-            else:
-                addition += " with no side"
-            ordered.append(addition)
-
-        if(meal2 == 'on'):
-            total_cost += 12.99
-            addition = "Meal 2"
-            if(side2 == 'Sauerkraut'):
-                addition += " with Side Sauerkraut"
-            elif(side2 == 'Potato'):
-                addition += " with Side Potato Salad"
-            else:
-                addition += " with no side"
-            ordered.append(addition)
-
-        if(meal3 == 'on'):
-            total_cost += 11.99
-            addition = "Meal 3"
-            if(side3 == 'Sauerkraut'):
-                addition += " with Side Sauerkraut"
-            elif(side3 == 'Potato'):
-                addition += " with Side Potato Salad"
-            else:
-                addition += " with no side"
-            ordered.append(addition)
-
-        if(meal4 == 'on'):
-            total_cost += 13.99
-            addition = "Meal 4"
-            if(side4 == 'Sauerkraut'):
-                addition += " with Side Sauerkraut"
-            elif(side4 == 'Potato'):
-                addition += " with Side Potato Salad"
-            else:
-                addition += " with no side"
-            ordered.append(addition)
-
-        if(spz == 'on'):
-            total_cost += float(special_cost[1:])
-            ordered.append(special_item)
-
-
-        #Create a random readyTime (30-60min)
-        expected = readyTime()
-        expected = expected.strftime("%H:%M")
-
-        context = {'ordered': ordered,
-                'instructions': instructions,
-                'name':name,
-                'phone':phone,
-                'email':email,
-                'total_cost':total_cost,
-                'expected': expected}
+        try:
+            order, lines = build_order(form_to_order(request.POST), get_menu())
+        except OrderError as e:
+            return order_view(request, error=str(e))
+        save_orders([(order, lines)])
+
+        context = {'ordered': [str(line) for line in lines],
+                'instructions': order.instructions,
+                'name': order.name,
+                'phone': order.phone,
+                'email': order.email,
+                'total_cost': order.total,
+                'expected': timezone.localtime(order.ready_at).strftime("%H:%M")}
         return render(request, "restaurant/confirmation.html", context)
     
     return redirect('order')
 
-def readyTime():
-    current_time = datetime.datetime.now()
-    rand_min = random.randint(30, 60)
-    expected = current_time + datetime.timedelta(minutes=rand_min)
-    return expected
+@csrf_exempt
+@require_POST
+def order_batch_view(request):
+    """accepts a JSON batch of orders {"orders": [...]} and stores them in one transaction.
+    the request must carry the token from settings.RESTAURANT_ORDER_TOKEN in an Authorization: Bearer header"""
+    token = getattr(settings, 'RESTAURANT_ORDER_TOKEN', '')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    #compare bytes: compare_digest rejects str with non-ASCII characters
+    if not token or not hmac.compare_digest(supplied.encode(), token.encode()):
+        response = JsonResponse({'error': 'invalid token'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    try:
+        orders = json.loads(request.body).get('orders')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'body must be a JSON object'}, status=400)
+    if not isinstance(orders, list) or not orders:
+        return JsonResponse({'error': 'orders must be a non-empty list'}, status=400)
+    if len(orders) > MAX_BATCH:
+        return JsonResponse({'error': f'at most {MAX_BATCH} orders per batch'}, status=400)
+
+    #validate the whole batch before writing any of it
+    menu = get_menu()
+    placed_at = timezone.now()
+    pairs = []
+    for i, data in enumerate(orders):
+        try:
+            pairs.append(build_order(data, menu, placed_at))
+        except OrderError as e:
+            return JsonResponse({'error': f'order {i}: {e}'}, status=400)
+
+    saved = save_orders(pairs)
+    return JsonResponse({'orders': [{'id': order.pk,
+                                     'total': str(order.total),
+                                     'ready_at': order.ready_at.isoformat()}
+                                    for order in saved]}, status=201)
+
+#longest window shown on the sales dashboard, in days
+MAX_SALES_DAYS = 366
+
+@staff_member_required
+def sales_view(request):
+    """provides the sales dashboard; reads only the pre-aggregated SalesRollup table"""
+    try:
+        days = min(max(int(request.GET.get('days', 7)), 1), MAX_SALES_DAYS)
+    except ValueError:
+        days = 7
+    since = analytics.hour_bucket(timezone.now() - datetime.timedelta(days=days))
+    context = {'days': days,
+               'items': analytics.sales_by_item(since),
+               'sides': analytics.sales_by_side(since),
+               'hours': analytics.sales_by_hour(since)}
+    return render(request, "restaurant/sales.html", context)
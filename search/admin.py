@@ -0,0 +1,7 @@
+## search/admin.py
+from django.contrib import admin
+
+# Register your models here.
+from .models import *
+
+admin.site.register(SearchDocument)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        '''Connect the signal handlers that keep the search index current.'''
+        from . import signals  # noqa: F401
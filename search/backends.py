@@ -0,0 +1,88 @@
+## search/backends.py
+# Database-specific full-text search over SearchDocument.
+#   SQLiteFTSBackend   - the search_fts FTS5 table, ranked with bm25()
+#   PostgresBackend    - the search_searchdocument.vector tsvector column (GIN index), ranked with ts_rank_cd()
+#   SimpleBackend      - icontains scan, for any other database
+# The FTS5 table and the tsvector column are created in search/migrations/0002_fulltext_index.py.
+import re
+from abc import ABC, abstractmethod
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import SearchDocument
+
+#weight of a match in the title relative to a match in the body
+TITLE_WEIGHT = 10.0
+
+class SearchBackend(ABC):
+    '''Base class of the backends.'''
+
+    @abstractmethod
+    def search(self, query, limit, offset=0):
+        '''Return up to limit (doc_type, object_id) pairs matching query, best match first,
+        skipping the first offset.'''
+
+def fts5_query(query):
+    '''Turn free text typed by a user into a safe FTS5 MATCH expression:
+    every word must appear, and the last word may be a prefix.'''
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+class SQLiteFTSBackend(SearchBackend):
+    '''Search the SQLite FTS5 index.'''
+
+    def search(self, query, limit, offset=0):
+        match = fts5_query(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            # bm25() is smaller for better matches
+            cursor.execute(
+                'SELECT d.doc_type, d.object_id '
+                'FROM search_fts JOIN search_searchdocument d ON d.id = search_fts.rowid '
+                'WHERE search_fts MATCH %s '
+                'ORDER BY bm25(search_fts, %s, 1.0), d.id '
+                'LIMIT %s OFFSET %s',
+                [match, TITLE_WEIGHT, limit, offset])
+            return cursor.fetchall()
+
+class PostgresBackend(SearchBackend):
+    '''Search the PostgreSQL tsvector column through its GIN index.'''
+
+    def search(self, query, limit, offset=0):
+        if not query.strip():
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT doc_type, object_id '
+                "FROM search_searchdocument, websearch_to_tsquery('english', %s) AS q "
+                'WHERE vector @@ q '
+                'ORDER BY ts_rank_cd(vector, q) DESC, id '
+                'LIMIT %s OFFSET %s',
+                [query, limit, offset])
+            return cursor.fetchall()
+
+class SimpleBackend(SearchBackend):
+    '''Unindexed fallback for databases without a full-text backend; unranked.'''
+
+    def search(self, query, limit, offset=0):
+        documents = SearchDocument.objects.all()
+        words = query.split()
+        if not words:
+            return []
+        for word in words:
+            documents = documents.filter(Q(title__icontains=word) | Q(body__icontains=word))
+        return list(documents.order_by('id').values_list('doc_type', 'object_id')[offset:offset + limit])
+
+def get_backend():
+    '''Return the search backend for the default database.'''
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresBackend()
+    return SimpleBackend()
@@ -0,0 +1,44 @@
+## search/documents.py
+# Which models are searchable, and how each object turns into a SearchDocument.
+from blog.models import Article
+from mini_fb.models import StatusMessage
+
+from .models import SearchDocument
+
+#model -> (doc_type, function returning the (title, body) of an object)
+INDEXED_MODELS = {
+    StatusMessage: ('status', lambda message: ('', message.message)),
+    Article: ('article', lambda article: (article.title, article.text)),
+}
+
+#doc_type -> model
+DOC_TYPES = {doc_type: model for model, (doc_type, _) in INDEXED_MODELS.items()}
+
+def index_object(obj):
+    '''Add obj to the search index, or update its entry.'''
+    doc_type, get_text = INDEXED_MODELS[type(obj)]
+    title, body = get_text(obj)
+    SearchDocument.objects.update_or_create(doc_type=doc_type, object_id=obj.pk,
+                                            defaults={'title': title, 'body': body})
+
+def unindex_object(obj):
+    '''Remove obj from the search index.'''
+    doc_type, _ = INDEXED_MODELS[type(obj)]
+    SearchDocument.objects.filter(doc_type=doc_type, object_id=obj.pk).delete()
+
+def load_objects(hits):
+    '''Return the indexed objects for a list of (doc_type, object_id) hits, in the same order.
+    Each kind of object is loaded with one query; hits whose object no longer exists are skipped.'''
+    ids_by_type = {}
+    for doc_type, object_id in hits:
+        ids_by_type.setdefault(doc_type, []).append(object_id)
+    loaded = {}
+    for doc_type, ids in ids_by_type.items():
+        model = DOC_TYPES[doc_type]
+        queryset = model._default_manager.all()
+        if model is StatusMessage:
+            queryset = queryset.select_related('profile')
+        for pk, obj in queryset.in_bulk(ids).items():
+            loaded[(doc_type, pk)] = obj
+    return [(doc_type, loaded[(doc_type, object_id)]) for doc_type, object_id in hits
+            if (doc_type, object_id) in loaded]
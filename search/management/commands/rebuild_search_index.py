@@ -0,0 +1,28 @@
+## search/management/commands/rebuild_search_index.py
+# Rebuild the full-text search index from scratch.
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from search.documents import INDEXED_MODELS
+from search.models import SearchDocument
+
+class Command(BaseCommand):
+    '''Delete every SearchDocument and index every StatusMessage and Article again.'''
+    help = 'Rebuild the full-text search index for mini_fb StatusMessages and blog Articles.'
+
+    def handle(self, *args, **options):
+        total = 0
+        with transaction.atomic():
+            SearchDocument.objects.all().delete()
+            for model, (doc_type, get_text) in INDEXED_MODELS.items():
+                documents = []
+                for obj in model._default_manager.iterator():
+                    title, body = get_text(obj)
+                    documents.append(SearchDocument(doc_type=doc_type, object_id=obj.pk, title=title, body=body))
+                SearchDocument.objects.bulk_create(documents, batch_size=500)
+                total += len(documents)
+            if connection.vendor == 'sqlite':
+                # also compact the FTS5 index
+                with connection.cursor() as cursor:
+                    cursor.execute("INSERT INTO search_fts(search_fts) VALUES ('optimize')")
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} documents.'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-17 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doc_type', 'object_id'), name='unique_search_document')],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Build the database-specific full-text index on top of search_searchdocument,
+# then index the StatusMessages and Articles that already exist.
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    # external-content FTS5 table: the text lives in search_searchdocument, FTS5 only keeps the index
+    "CREATE VIRTUAL TABLE search_fts USING fts5("
+    "title, body, content='search_searchdocument', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER search_fts_insert AFTER INSERT ON search_searchdocument BEGIN "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER search_fts_delete AFTER DELETE ON search_searchdocument BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER search_fts_update AFTER UPDATE ON search_searchdocument BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS search_fts_update",
+    "DROP TRIGGER IF EXISTS search_fts_delete",
+    "DROP TRIGGER IF EXISTS search_fts_insert",
+    "DROP TABLE IF EXISTS search_fts",
+]
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE search_searchdocument ADD COLUMN vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(body, '')), 'B')) STORED",
+    "CREATE INDEX search_document_vector_idx ON search_searchdocument USING GIN (vector)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS search_document_vector_idx",
+    "ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS vector",
+]
+
+def run_sql(statements_by_vendor):
+    '''Return a RunPython function executing the statements for the current database vendor.'''
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+def index_existing(apps, schema_editor):
+    '''Create a SearchDocument for every existing StatusMessage and Article.'''
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    StatusMessage = apps.get_model('mini_fb', 'StatusMessage')
+    Article = apps.get_model('blog', 'Article')
+    documents = [SearchDocument(doc_type='status', object_id=pk, title='', body=message)
+                 for pk, message in StatusMessage.objects.values_list('id', 'message').iterator()]
+    documents += [SearchDocument(doc_type='article', object_id=pk, title=title, body=text)
+                  for pk, title, text in Article.objects.values_list('id', 'title', 'text').iterator()]
+    SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('mini_fb', '0016_profile_directory_indexes'),
+        ('blog', '0006_content_addressed_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_sql({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run_sql({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+        migrations.RunPython(index_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+## search/models.py
+# The full-text search index: one SearchDocument per indexed object
+# (mini_fb StatusMessages and blog Articles, see search/documents.py).
+# The database-specific full-text structures (an FTS5 table on SQLite, a tsvector
+# column with a GIN index on PostgreSQL) are built on top of this table by
+# search/migrations/0002_fulltext_index.py and queried by search/backends.py.
+from django.db import models
+
+class SearchDocument(models.Model):
+    '''Encapsulate the idea of the searchable text of one indexed object.'''
+    #which kind of object this is ('status' or 'article') and its primary key
+    doc_type = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    title = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doc_type', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        '''Return a string representation of this SearchDocument object.'''
+        return f'{self.doc_type} {self.object_id}: {self.title or self.body[:50]}'
@@ -0,0 +1,19 @@
+## search/signals.py
+# Keep the search index current as indexed objects are created, updated and deleted.
+# Connected in SearchConfig.ready() (search/apps.py).
+from django.db.models.signals import post_save, post_delete
+
+from .documents import INDEXED_MODELS, index_object, unindex_object
+
+def object_saved(sender, instance, raw=False, **kwargs):
+    '''Index a new or edited object.'''
+    if not raw:
+        index_object(instance)
+
+def object_deleted(sender, instance, **kwargs):
+    '''Drop a deleted object from the index.'''
+    unindex_object(instance)
+
+for model in INDEXED_MODELS:
+    post_save.connect(object_saved, sender=model, dispatch_uid=f'search_saved_{model.__name__}')
+    post_delete.connect(object_deleted, sender=model, dispatch_uid=f'search_deleted_{model.__name__}')
@@ -0,0 +1,127 @@
+## search/tests.py
+# Tests for the search app
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from blog.models import Article
+from mini_fb.models import Profile, StatusMessage
+
+from .backends import SearchBackend, SQLiteFTSBackend, SimpleBackend, fts5_query
+from .views import PAGE_SIZE
+
+class SearchTestMixin:
+    '''Helpers to create searchable objects and run searches.'''
+
+    backend_class = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='writer')
+        cls.profile = Profile.objects.create(user=cls.user, firstName='Frodo', lastName='Baggins',
+                                             city='Shire', email='f@example.com')
+
+    def status(self, text):
+        return StatusMessage.objects.create(profile=self.profile, message=text)
+
+    def article(self, title, text):
+        return Article.objects.create(title=title, author='writer', text=text, user=self.user)
+
+    def search(self, query, limit=100, offset=0):
+        return self.backend_class().search(query, limit, offset)
+
+class FTS5QueryTest(unittest.TestCase):
+    '''User input never reaches FTS5 as query syntax.'''
+
+    def test_words_are_quoted_and_last_is_a_prefix(self):
+        self.assertEqual(fts5_query('second breakfast'), '"second" "breakfast"*')
+
+    def test_syntax_is_dropped(self):
+        self.assertEqual(fts5_query('"ring'), '"ring"*')
+        self.assertEqual(fts5_query('ring* -mordor'), '"ring" "mordor"*')
+        self.assertEqual(fts5_query('NEAR(ring mordor)'), '"NEAR" "ring" "mordor"*')
+        self.assertEqual(fts5_query('title:ring AND (OR)'), '"title" "ring" "AND" "OR"*')
+        self.assertEqual(fts5_query('"*-^:()'), '')
+
+    def test_backends_are_abstract(self):
+        with self.assertRaises(TypeError):
+            SearchBackend()
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'the FTS5 index only exists on SQLite')
+class SQLiteFTSBackendTest(SearchTestMixin, TestCase):
+    '''The FTS5 index follows the objects through its triggers, and ranks and pages the matches.'''
+
+    backend_class = SQLiteFTSBackend
+
+    def assertIndexIntact(self):
+        # fails if the external-content index differs from search_searchdocument
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO search_fts(search_fts) VALUES ('integrity-check')")
+
+    def test_triggers_keep_index_in_sync(self):
+        message = self.status('walking to Mordor')
+        self.assertEqual(self.search('mordor'), [('status', message.pk)])
+        message.message = 'sailing to Valinor'
+        message.save()
+        self.assertEqual(self.search('mordor'), [])
+        self.assertEqual(self.search('valinor'), [('status', message.pk)])
+        self.assertIndexIntact()
+        message.delete()
+        self.assertEqual(self.search('valinor'), [])
+        self.assertIndexIntact()
+
+    def test_title_matches_rank_first(self):
+        in_body = self.article('Travels', 'we took the ring to the mountain')
+        in_title = self.article('The ring', 'a story about jewellery')
+        status = self.status('who has seen my ring?')
+        hits = self.search('ring')
+        self.assertEqual(hits[0], ('article', in_title.pk))
+        self.assertCountEqual(hits[1:], [('article', in_body.pk), ('status', status.pk)])
+
+    def test_prefix_and_stemming(self):
+        message = self.status('the hobbits were walking')
+        self.assertEqual(self.search('hobb'), [('status', message.pk)])
+        self.assertEqual(self.search('walks hobbit'), [('status', message.pk)])
+
+    def test_fts_syntax_in_queries(self):
+        message = self.status('"second" breakfast - near the Prancing Pony*')
+        for query in ['"second', 'breakfast*', '-breakfast', 'NEAR(second breakfast)', 'pony:', '(', '"']:
+            self.search(query)
+        self.assertEqual(self.search('second -breakfast'), [('status', message.pk)])
+
+    def test_pagination(self):
+        messages = [self.status(f'elevenses number {i}') for i in range(PAGE_SIZE + 5)]
+        first = self.search('elevenses', limit=PAGE_SIZE)
+        second = self.search('elevenses', limit=PAGE_SIZE, offset=PAGE_SIZE)
+        self.assertEqual(len(first), PAGE_SIZE)
+        self.assertEqual(len(second), 5)
+        self.assertCountEqual(first + second, [('status', m.pk) for m in messages])
+
+    def test_view_pages(self):
+        for i in range(PAGE_SIZE + 5):
+            self.status(f'elevenses number {i}')
+        response = self.client.get(reverse('search'), {'q': 'elevenses'})
+        self.assertEqual(len(response.context['results']), PAGE_SIZE)
+        self.assertEqual(response.context['next_page'], 2)
+        response = self.client.get(reverse('search'), {'q': 'elevenses', 'page': 2})
+        self.assertEqual(len(response.context['results']), 5)
+        self.assertIsNone(response.context['next_page'])
+        self.assertEqual(response.context['previous_page'], 1)
+
+class SimpleBackendTest(SearchTestMixin, TestCase):
+    '''The unindexed fallback needs every word and pages in id order.'''
+
+    backend_class = SimpleBackend
+
+    def test_every_word_must_match(self):
+        both = self.status('second breakfast')
+        self.status('second helping')
+        self.assertEqual(self.search('breakfast second'), [('status', both.pk)])
+        self.assertEqual(self.search('  '), [])
+
+    def test_pagination(self):
+        messages = [self.status(f'elevenses {i}') for i in range(5)]
+        self.assertEqual(self.search('elevenses', limit=2, offset=2), [('status', m.pk) for m in messages[2:4]])
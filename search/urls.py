@@ -0,0 +1,9 @@
+## search/urls.py
+## description: URL patterns for the search app
+from django.urls import path
+
+from .views import *
+
+urlpatterns = [
+    path('', search_view, name='search'),
+]
@@ -0,0 +1,31 @@
+## search/views.py
+# description: ranked, paginated full-text search over status messages and blog articles
+from django.shortcuts import render
+
+from .backends import get_backend
+from .documents import load_objects
+
+#results per page, and how deep the results can be paged
+PAGE_SIZE = 20
+MAX_PAGE = 50
+
+def search_view(request):
+    """provides the functionality for the search results page (?q=words&page=n)"""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = min(max(int(request.GET.get('page', 1)), 1), MAX_PAGE)
+    except ValueError:
+        page = 1
+    results = []
+    has_next = False
+    if query:
+        # fetch one extra hit to find out whether there is another page
+        hits = get_backend().search(query, limit=PAGE_SIZE + 1, offset=(page - 1) * PAGE_SIZE)
+        has_next = len(hits) > PAGE_SIZE and page < MAX_PAGE
+        results = load_objects(hits[:PAGE_SIZE])
+    context = {'query': query,
+               'results': results,
+               'page': page,
+               'previous_page': page - 1 if page > 1 else None,
+               'next_page': page + 1 if has_next else None}
+    return render(request, "search/results.html", context)